@@ -1,28 +1,94 @@
 """Support for Deebot Vaccums."""
 import asyncio
 import logging
-from typing import Any, Dict
+import shutil
+import time
+from functools import partial
+from typing import Any, Dict, List
 
+import voluptuous as vol
 from awesomeversion import AwesomeVersion
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_DEVICES, CONF_USERNAME, CONF_VERIFY_SSL
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_DEVICES,
+    CONF_USERNAME,
+    CONF_VERIFY_SSL,
+    EVENT_HOMEASSISTANT_STOP,
+)
 from homeassistant.const import __version__ as HA_VERSION
-from homeassistant.core import HomeAssistant
+from homeassistant.core import Event, HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry
+from homeassistant.helpers.service import async_register_admin_service
+from homeassistant.helpers.storage import STORAGE_DIR
 
 from . import hub
+from .bot import TrackedVacuumBot
+from .clean_image_cache import CleanImageCache, DeebotCleanImageView
+from .commands import async_execute_fleet_command
 from .const import (
+    CLEAN_IMAGE_CACHE_DIR,
+    CLEAN_IMAGE_CACHE_MAX_SIZE,
+    CONF_BACKGROUND_SETUP,
     CONF_BUMPER,
     CONF_CLIENT_DEVICE_ID,
+    DATA_CLEAN_IMAGE_CACHE,
+    DATA_DIAGNOSTICS_VIEW,
+    DATA_MQTT,
+    DATA_PROFILER,
     DOMAIN,
+    EVENT_FLEET_COMMAND_FINISHED,
+    EVENT_PROFILE_FINISHED,
+    FLEET_COMMAND_MAX_CONCURRENCY,
+    FLEET_COMMAND_TIMEOUT,
     MIN_REQUIRED_HA_VERSION,
     STARTUP_MESSAGE,
 )
+from .diagnostics import DeebotDiagnosticsView
 from .helpers import get_bumper_device_id
+from .profiler import async_profile, is_profiling
+from .storage import get_clean_stats_store, get_snapshot_store, get_store
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = ["sensor", "binary_sensor", "vacuum", "camera"]
 
+# Must be kept in sync with services.yaml
+SERVICE_PROFILE = "profile"
+SERVICE_PROFILE_DURATION = "duration"
+SERVICE_PROFILE_TOP = "top"
+SERVICE_PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(SERVICE_PROFILE_DURATION, default=60): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+        vol.Optional(SERVICE_PROFILE_TOP, default=30): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+SERVICE_FLEET_COMMAND = "fleet_command"
+SERVICE_FLEET_COMMAND_COMMAND = "command"
+SERVICE_FLEET_COMMAND_PARAMS = "params"
+SERVICE_FLEET_COMMAND_MAX_CONCURRENCY = "max_concurrency"
+SERVICE_FLEET_COMMAND_TIMEOUT = "timeout"
+SERVICE_FLEET_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(SERVICE_FLEET_COMMAND_COMMAND): cv.string,
+        vol.Optional(SERVICE_FLEET_COMMAND_PARAMS): dict,
+        vol.Optional(
+            SERVICE_FLEET_COMMAND_MAX_CONCURRENCY,
+            default=FLEET_COMMAND_MAX_CONCURRENCY,
+        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(
+            SERVICE_FLEET_COMMAND_TIMEOUT, default=FLEET_COMMAND_TIMEOUT
+        ): vol.All(vol.Coerce(float), vol.Range(min=1, max=300)),
+    }
+)
+
 
 def is_ha_supported() -> bool:
     """Return True, if current HA version is supported."""
@@ -46,23 +112,140 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if not is_ha_supported():
         return False
 
+    if DATA_DIAGNOSTICS_VIEW not in hass.data:
+        hass.data[DATA_DIAGNOSTICS_VIEW] = True
+        hass.http.register_view(DeebotDiagnosticsView)
+
+    if DATA_CLEAN_IMAGE_CACHE not in hass.data:
+        cache = CleanImageCache(
+            hass,
+            hass.config.path(STORAGE_DIR, CLEAN_IMAGE_CACHE_DIR),
+            CLEAN_IMAGE_CACHE_MAX_SIZE,
+        )
+        hass.data[DATA_CLEAN_IMAGE_CACHE] = cache
+        hass.http.register_view(DeebotCleanImageView(cache))
+
+    if not hass.services.has_service(DOMAIN, SERVICE_PROFILE):
+        _async_register_services(hass)
+
 
 
     # Store an instance of the "connecting" class that does the work of speaking
     # with your actual devices.
-    deebot_hub = hub.DeebotHub(hass, entry.data)
-    await deebot_hub.async_setup()
+    deebot_hub = hub.DeebotHub(hass, entry.data, entry.entry_id, entry.options)
+    await deebot_hub.async_setup(entry.options.get(CONF_BACKGROUND_SETUP, False))
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = deebot_hub
     hass.config_entries.async_setup_platforms(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    async def save_snapshot(_: Event) -> None:
+        await deebot_hub.async_save_snapshot()
+
+    entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, save_snapshot)
+    )
     return True
 
 
+def _async_register_services(hass: HomeAssistant) -> None:
+    async def profile(call: ServiceCall) -> None:
+        if is_profiling(hass):
+            raise HomeAssistantError("A profile is already running")
+
+        async def run() -> None:
+            try:
+                path = await async_profile(
+                    hass,
+                    call.data[SERVICE_PROFILE_DURATION],
+                    call.data[SERVICE_PROFILE_TOP],
+                )
+            except HomeAssistantError as ex:
+                _LOGGER.error("Profiling failed: %s", ex)
+                return
+            hass.bus.async_fire(EVENT_PROFILE_FINISHED, {"path": path})
+
+        # the profile runs longer than a service call should take
+        hass.async_create_task(run())
+
+    async_register_admin_service(
+        hass, DOMAIN, SERVICE_PROFILE, profile, schema=SERVICE_PROFILE_SCHEMA
+    )
+
+    async def fleet_command(call: ServiceCall) -> None:
+        # each bot gets the command once and has one result
+        entity_ids: List[str] = list(dict.fromkeys(call.data[ATTR_ENTITY_ID]))
+        command: str = call.data[SERVICE_FLEET_COMMAND_COMMAND]
+        vacuum_bots = [_get_vacuum_bot(hass, entity_id) for entity_id in entity_ids]
+
+        start = time.monotonic()
+        results = await async_execute_fleet_command(
+            vacuum_bots,
+            command,
+            call.data.get(SERVICE_FLEET_COMMAND_PARAMS),
+            call.data[SERVICE_FLEET_COMMAND_MAX_CONCURRENCY],
+            call.data[SERVICE_FLEET_COMMAND_TIMEOUT],
+        )
+        duration = time.monotonic() - start
+
+        failed = sum(1 for result in results if not result.success)
+        _LOGGER.info(
+            "Fleet command %s sent to %d bots in %.2f seconds, %d failed",
+            command,
+            len(results),
+            duration,
+            failed,
+        )
+        hass.bus.async_fire(
+            EVENT_FLEET_COMMAND_FINISHED,
+            {
+                "command": command,
+                "succeeded": len(results) - failed,
+                "failed": failed,
+                "duration_ms": round(duration * 1000),
+                "results": {
+                    entity_id: result.as_dict()
+                    for entity_id, result in zip(entity_ids, results)
+                },
+            },
+        )
+
+    # raw commands are sent without the permission checks of entity services
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_FLEET_COMMAND,
+        fleet_command,
+        schema=SERVICE_FLEET_COMMAND_SCHEMA,
+    )
+
+
+def _get_vacuum_bot(hass: HomeAssistant, entity_id: str) -> TrackedVacuumBot:
+    entry = entity_registry.async_get(hass).async_get(entity_id)
+    if entry is None or entry.platform != DOMAIN or entry.domain != "vacuum":
+        raise HomeAssistantError(f"{entity_id} is no Deebot vacuum")
+
+    deebot_hub = hass.data.get(DOMAIN, {}).get(entry.config_entry_id)
+    vacuum_bot = (
+        None if deebot_hub is None else deebot_hub.get_vacuum_bot(entry.unique_id)
+    )
+    if not isinstance(vacuum_bot, TrackedVacuumBot):
+        raise HomeAssistantError(f"{entity_id} is not loaded")
+    return vacuum_bot
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload config entry, when the options were changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     # This is called when an entry/configured device is to be removed. The class
     # needs to unload itself, and remove callbacks. See the classes for further
     # details
+    # the entities must be still subscribed to have the last events
+    await hass.data[DOMAIN][entry.entry_id].async_save_snapshot()
     unload_ok = all(
         await asyncio.gather(
             *[
@@ -75,12 +258,29 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok:
         hass.data[DOMAIN][entry.entry_id].disconnect()
         hass.data[DOMAIN].pop(entry.entry_id)
-        if len(hass.data[DOMAIN]) == 0:
+        if all(key in (DATA_MQTT, DATA_PROFILER) for key in hass.data[DOMAIN]):
+            # only the mqtt connection manager without connections is left
             hass.data.pop(DOMAIN)
+            hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
+            hass.services.async_remove(DOMAIN, SERVICE_FLEET_COMMAND)
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored data of a config entry."""
+    await get_store(hass, entry.entry_id).async_remove()
+    await get_snapshot_store(hass, entry.entry_id).async_remove()
+    await get_clean_stats_store(hass, entry.entry_id).async_remove()
+    await hass.async_add_executor_job(
+        partial(
+            shutil.rmtree,
+            hub.get_clean_history_path(hass, entry.entry_id),
+            ignore_errors=True,
+        )
+    )
+
+
 async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Migrate old entry."""
     _LOGGER.debug("Migrating from version %d", config_entry.version)
@@ -2,15 +2,15 @@
 import logging
 from typing import Any, Dict, Optional
 
-from deebotozmo.event_emitter import EventListener
 from deebotozmo.events import WaterInfoEvent
-from deebotozmo.vacuum_bot import VacuumBot
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .bot import TrackedVacuumBot
 from .const import DOMAIN
+from .entity import DeebotEntity
 from .helpers import get_device_info
 from .hub import DeebotHub
 
@@ -27,21 +27,21 @@ async def async_setup_entry(
 
     new_devices = []
     for vacbot in hub.vacuum_bots:
-        new_devices.append(DeebotMopAttachedBinarySensor(vacbot, "mop_attached"))
+        new_devices.append(DeebotMopAttachedBinarySensor(hub, vacbot, "mop_attached"))
 
     if new_devices:
         async_add_entities(new_devices)
 
 
-class DeebotMopAttachedBinarySensor(BinarySensorEntity):  # type: ignore
+class DeebotMopAttachedBinarySensor(DeebotEntity, BinarySensorEntity):  # type: ignore
     """Deebot mop attached binary sensor."""
 
     _attr_should_poll = False
     _attr_entity_registry_enabled_default = False
 
-    def __init__(self, vacuum_bot: VacuumBot, device_id: str):
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot, device_id: str):
         """Initialize the Sensor."""
-        self._vacuum_bot: VacuumBot = vacuum_bot
+        super().__init__(hub, vacuum_bot)
 
         if self._vacuum_bot.vacuum.nick is not None:
             name: str = self._vacuum_bot.vacuum.nick
@@ -68,7 +68,6 @@ class DeebotMopAttachedBinarySensor(BinarySensorEntity):  # type: ignore
 
         async def on_event(event: WaterInfoEvent) -> None:
             self._attr_is_on = event.mop_attached
-            self.async_write_ha_state()
+            self.async_schedule_write_ha_state()
 
-        listener: EventListener = self._vacuum_bot.events.water_info.subscribe(on_event)
-        self.async_on_remove(listener.unsubscribe)
+        self._subscribe("water_info", on_event)
@@ -0,0 +1,139 @@
+"""Bot module."""
+import logging
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Type, Union
+
+from deebotozmo.commands import (
+    MAP_COMMANDS,
+    Command,
+    GetBattery,
+    GetChargeState,
+    GetCleanInfo,
+    GetCleanLogs,
+    GetError,
+    GetFanSpeed,
+    GetLifeSpan,
+    GetStats,
+    GetWaterInfo,
+)
+from deebotozmo.commands.custom import CustomCommand
+from deebotozmo.vacuum_bot import VacuumBot
+
+from .command_queue import CommandQueue
+from .const import COMMAND_BURST, COMMAND_RATE_LIMIT
+from .recorder import EventRecorder, is_replaying
+
+if TYPE_CHECKING:
+    from asyncio import Task
+
+_LOGGER = logging.getLogger(__name__)
+
+# Commands, which only read the state of the bot. They are sent without queueing
+_READ_COMMANDS: Tuple[Type[Command], ...] = (
+    GetBattery,
+    GetChargeState,
+    GetCleanInfo,
+    GetCleanLogs,
+    GetError,
+    GetFanSpeed,
+    GetLifeSpan,
+    GetStats,
+    GetWaterInfo,
+    *MAP_COMMANDS,
+)
+
+# Response of the command sent by the current task, see _async_send
+_response: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "deebot_response", default=None
+)
+
+
+class TrackedVacuumBot(VacuumBot):
+    """Vacuum bot, which remembers when it was heard from the last time."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # monotonic timestamp of the last message from the bot
+        self.last_seen: Optional[float] = None
+        # records the received messages, if set
+        self.recorder: Optional[EventRecorder] = None
+        # running refreshes by part, see commands.async_refresh
+        self.refresh_tasks: Dict[str, "Task[bool]"] = {}
+        self.command_queue = CommandQueue(
+            self._async_send, COMMAND_RATE_LIMIT, COMMAND_BURST
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return True, if the bot is available."""
+        return self._status.available
+
+    def seen_within(self, seconds: float) -> bool:
+        """Return True, if the bot was heard from in the given time."""
+        return (
+            self.last_seen is not None and time.monotonic() - self.last_seen < seconds
+        )
+
+    async def execute_command(self, command: Union[Command, CustomCommand]) -> None:
+        """Execute the given command.
+
+        Read commands are sent directly, all others are passed through the command
+        queue, which merges superseded commands and limits the rate. Commands
+        caused by replayed messages (ex. map pieces) are not sent.
+        """
+        await self.execute_command_with_response(command)
+
+    async def execute_command_with_response(
+        self, command: Union[Command, CustomCommand]
+    ) -> Dict[str, Any]:
+        """Execute the given command and return the response of the bot.
+
+        If the queue replaced the command by a later one, the response of the later
+        one is returned. An empty dict is returned, if the bot didn't respond.
+        """
+        if is_replaying():
+            _LOGGER.debug("Not sending %s while replaying", command.name)
+            return {}
+
+        if isinstance(command, _READ_COMMANDS):
+            return await self._async_send(command)
+        return await self.command_queue.async_execute(command)
+
+    async def _async_send(
+        self, command: Union[Command, CustomCommand]
+    ) -> Dict[str, Any]:
+        # VacuumBot.execute_command handles the response in the same task, where
+        # it is stored in the slot of this call. Concurrent commands with the
+        # same name are running in other tasks and can't get mixed up
+        response: Dict[str, Any] = {}
+        token = _response.set(response)
+        try:
+            await super().execute_command(command)
+        finally:
+            _response.reset(token)
+        return response
+
+    async def handle(
+        self, command: Union[str, Command, CustomCommand], message: Dict[str, Any]
+    ) -> None:
+        """Handle the given event and record that the bot is alive."""
+        if is_replaying():
+            await super().handle(command, message)
+            return
+
+        if self.recorder is not None:
+            self.recorder.record(self.vacuum.did, command, message)
+
+        response = _response.get()
+        if response is not None and not isinstance(command, str) and not response:
+            response.update(message)
+
+        # command names are only passed for messages received over MQTT,
+        # responses to requested commands are only proof of life if successful
+        if isinstance(command, str) or message.get("ret") == "ok":
+            self.last_seen = time.monotonic()
+            if not self._status.available:
+                self.set_available(True)
+
+        await super().handle(command, message)
@@ -1,19 +1,21 @@
 """Support for Deebot Vaccums."""
-import base64
 import logging
 from typing import Any, Dict, Optional
 
-from deebotozmo.event_emitter import EventListener
-from deebotozmo.events import MapEvent
-from deebotozmo.vacuum_bot import VacuumBot
+from aiohttp import web
+from deebotozmo.events import CleanLogEvent, MapEvent
 from homeassistant.components.camera import Camera
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN
+from .bot import TrackedVacuumBot
+from .clean_image_cache import CleanImageCache
+from .const import DATA_CLEAN_IMAGE_CACHE, DOMAIN
+from .entity import DeebotEntity
 from .helpers import get_device_info
 from .hub import DeebotHub
+from .map_image import MapFrameStream, MapImageRenderer
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,21 +31,28 @@ async def async_setup_entry(
     new_devices = []
 
     for vacbot in hub.vacuum_bots:
-        new_devices.append(DeeboLiveCamera(vacbot, "liveMap"))
+        new_devices.append(DeeboLiveCamera(hub, vacbot, "liveMap"))
+        new_devices.append(
+            DeebotLastCleanImageCamera(
+                hub, vacbot, hass.data[DATA_CLEAN_IMAGE_CACHE], "lastCleanImage"
+            )
+        )
 
     if new_devices:
         async_add_entities(new_devices)
 
 
-class DeeboLiveCamera(Camera):  # type: ignore
+class DeeboLiveCamera(DeebotEntity, Camera):  # type: ignore
     """Deebot Live Camera."""
 
     _attr_entity_registry_enabled_default = False
 
-    def __init__(self, vacuum_bot: VacuumBot, device_id: str):
+    _renderer: MapImageRenderer
+    _stream: MapFrameStream
+
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot, device_id: str):
         """Initialize the camera."""
-        super().__init__()
-        self._vacuum_bot: VacuumBot = vacuum_bot
+        super().__init__(hub, vacuum_bot)
 
         if self._vacuum_bot.vacuum.nick is not None:
             name: str = self._vacuum_bot.vacuum.nick
@@ -64,17 +73,123 @@ class DeeboLiveCamera(Camera):  # type: ignore
     ) -> Optional[bytes]:
         """Return a still image response from the camera.
 
-        Integrations may choose to ignore the height parameter in order to preserve aspect ratio
+        The map is scaled to fit into the given width and height, preserving the aspect ratio
         """
 
-        return base64.decodebytes(self._vacuum_bot.map.get_base64_map(width))
+        return await self._renderer.async_get_image(width, height)
+
+    async def handle_async_mjpeg_stream(
+        self, request: web.Request
+    ) -> Optional[web.StreamResponse]:
+        """Push a new map frame to the client, whenever the map changes."""
+        response = web.StreamResponse()
+        response.content_type = "multipart/x-mixed-replace;boundary=--frameboundary"
+        await response.prepare(request)
+
+        frames = self._stream.frames()
+        try:
+            async for frame in frames:
+                await response.write(
+                    bytes(
+                        "--frameboundary\r\n"
+                        f"Content-Type: {self._stream.content_type}\r\n"
+                        f"Content-Length: {len(frame)}\r\n\r\n",
+                        "utf-8",
+                    )
+                    + frame
+                    + b"\r\n"
+                )
+        except ConnectionResetError:
+            _LOGGER.debug("Map stream client disconnected")
+        finally:
+            await frames.aclose()
+
+        return response
 
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
+        self._renderer = MapImageRenderer(
+            self.hass,
+            self._vacuum_bot.map,
+            self._hub.map_render_semaphore,
+            self._hub.map_image_format,
+        )
+        self.content_type = self._renderer.content_type
+        self._stream = MapFrameStream(self._renderer, self._hub.map_stream_max_fps)
         await super().async_added_to_hass()
 
+        did = self._vacuum_bot.vacuum.did
+        self._hub.map_renderers[did] = self._renderer
+        self.async_on_remove(lambda: self._hub.map_renderers.pop(did, None))
+
+        image = self._hub.snapshot.get_map(did)
+        if image is not None:
+            self._renderer.restore(image)
+        self.async_on_remove(
+            self._hub.snapshot.add_map_source(did, lambda: self._renderer.last_image)
+        )
+
         async def on_event(_: MapEvent) -> None:
-            self.schedule_update_ha_state()
+            self._renderer.invalidate()
+            self.async_schedule_write_ha_state()
+
+        self._subscribe("map", on_event)
+
+
+class DeebotLastCleanImageCamera(DeebotEntity, Camera):  # type: ignore
+    """Deebot camera, which shows the image of the last clean from the cache."""
+
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:image-search"
+
+    def __init__(
+        self,
+        hub: DeebotHub,
+        vacuum_bot: TrackedVacuumBot,
+        cache: CleanImageCache,
+        device_id: str,
+    ):
+        """Initialize the camera."""
+        super().__init__(hub, vacuum_bot)
+        self._cache = cache
+        self._image_url: Optional[str] = None
+
+        if self._vacuum_bot.vacuum.nick is not None:
+            name: str = self._vacuum_bot.vacuum.nick
+        else:
+            # In case there is no nickname defined, use the device id
+            name = self._vacuum_bot.vacuum.did
+
+        self._attr_name = f"{name}_{device_id}"
+        self._attr_unique_id = f"{self._vacuum_bot.vacuum.did}_{device_id}"
+
+    @property
+    def device_info(self) -> Optional[Dict[str, Any]]:
+        """Return device specific attributes."""
+        return get_device_info(self._vacuum_bot)
+
+    async def async_camera_image(
+        self, width: Optional[int] = None, height: Optional[int] = None
+    ) -> Optional[bytes]:
+        """Return the image of the last clean, which is downloaded only once."""
+        if self._image_url is None:
+            return None
+
+        image = await self._cache.async_get(self._image_url, self._hub.verify_ssl)
+        if image is None:
+            return None
+
+        self.content_type = image.content_type
+        return image.data
+
+    async def async_added_to_hass(self) -> None:
+        """Set up the event listeners now that hass is ready."""
+        await super().async_added_to_hass()
+
+        async def on_event(event: CleanLogEvent) -> None:
+            image_url = event.logs[0].image_url if event.logs else None
+            if image_url != self._image_url:
+                self._image_url = image_url
+                self.async_schedule_write_ha_state()
 
-        listener: EventListener = self._vacuum_bot.events.map.subscribe(on_event)
-        self.async_on_remove(listener.unsubscribe)
+        self._subscribe("clean_logs", on_event)
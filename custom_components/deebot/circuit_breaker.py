@@ -0,0 +1,134 @@
+"""Circuit breaker module."""
+import logging
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum, unique
+from typing import Callable, List, Optional
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+from .const import (
+    CIRCUIT_BREAKER_JITTER,
+    CIRCUIT_BREAKER_MAX_DELAY,
+    DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    STATUS_POLL_INTERVAL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@unique
+class CircuitState(str, Enum):
+    """Enum class for all possible circuit breaker states."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class Backoff:
+    """Delays of the circuit breaker in seconds."""
+
+    base_delay: float = STATUS_POLL_INTERVAL
+    max_delay: float = CIRCUIT_BREAKER_MAX_DELAY
+    # relative random deviation of the delay
+    jitter: float = CIRCUIT_BREAKER_JITTER
+
+
+class CircuitBreaker:
+    """Circuit breaker with exponential backoff and jitter.
+
+    After failure_threshold consecutive failures the circuit opens and no calls
+    are made until the backoff delay expired. Then a single probe call is allowed
+    (half open), which either closes the circuit again or reopens it with a
+    doubled delay.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        backoff: Backoff = Backoff(),
+    ):
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._backoff = backoff
+        self._listeners: List[Callable[[], None]] = []
+        self.state: CircuitState = CircuitState.CLOSED
+        self.failures: int = 0
+        self.trips: int = 0
+        self.retry_at: Optional[float] = None
+
+    @property
+    def delay(self) -> float:
+        """Return the seconds to wait before the next call."""
+        if self.state != CircuitState.OPEN or self.retry_at is None:
+            return self._backoff.base_delay
+
+        remaining = self.retry_at - time.monotonic()
+        # the probe is due, but no call was needed since then
+        return remaining if remaining > 0 else self._backoff.base_delay
+
+    @callback
+    def add_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Add listener, which is called on state changes."""
+        self._listeners.append(listener)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(listener)
+
+        return remove_listener
+
+    def allow_request(self) -> bool:
+        """Return True, if a call is allowed now."""
+        if self.state == CircuitState.OPEN:
+            if self.retry_at is not None and time.monotonic() < self.retry_at:
+                return False
+            self._set_state(CircuitState.HALF_OPEN)
+
+        return True
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = None
+        if self.state != CircuitState.CLOSED:
+            _LOGGER.info("%s reachable again", self._name)
+            self._set_state(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        self.failures += 1
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self.failures >= self._failure_threshold
+        ):
+            self.trips += 1
+            backoff = min(
+                self._backoff.max_delay,
+                self._backoff.base_delay * 2 ** (self.trips - 1),
+            )
+            backoff *= random.uniform(
+                1 - self._backoff.jitter, 1 + self._backoff.jitter
+            )
+            self.retry_at = time.monotonic() + backoff
+            if self.state == CircuitState.CLOSED:
+                _LOGGER.warning(
+                    "%s unreachable after %d attempts. Retrying with backoff",
+                    self._name,
+                    self.failures,
+                )
+            else:
+                _LOGGER.debug(
+                    "%s still unreachable. Next attempt in %.0fs", self._name, backoff
+                )
+            self._set_state(CircuitState.OPEN)
+
+    def _set_state(self, state: CircuitState) -> None:
+        self.state = state
+        for listener in self._listeners:
+            listener()
@@ -0,0 +1,143 @@
+"""Clean history module."""
+import asyncio
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from deebotozmo.events import CleanLogEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+# Order of the fields in a stored line
+_FIELDS = ("timestamp", "area", "total_time", "type", "stop_reason", "image_url")
+
+
+def _encode(entry: CleanLogEntry) -> str:
+    return (
+        json.dumps([getattr(entry, field) for field in _FIELDS], separators=(",", ":"))
+        + "\n"
+    )
+
+
+def _read(path: str) -> List[CleanLogEntry]:
+    if not os.path.exists(path):
+        return []
+
+    entries = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                entries.append(CleanLogEntry(**dict(zip(_FIELDS, json.loads(line)))))
+            except (ValueError, TypeError):
+                # ex. a line, which was not completely written
+                _LOGGER.warning("Skipping invalid line in %s: %s", path, line)
+    return entries
+
+
+def _append(path: str, lines: List[str]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as file:
+        file.writelines(lines)
+
+
+def _sorted_by_timestamp(
+    entries: Iterable[CleanLogEntry],
+) -> List[Tuple[int, CleanLogEntry]]:
+    # entries without timestamp can't be indexed and are skipped
+    return sorted(
+        ((entry.timestamp, entry) for entry in entries if entry.timestamp is not None),
+        key=lambda pair: pair[0],
+    )
+
+
+def entry_as_dict(entry: CleanLogEntry) -> Dict[str, Any]:
+    """Return the entry as dict, like it is returned by the query service."""
+    return {
+        "start": None
+        if entry.timestamp is None
+        else dt_util.utc_from_timestamp(entry.timestamp).isoformat(),
+        "area": entry.area,
+        "duration": entry.total_time,
+        "type": entry.type,
+        "stop_reason": entry.stop_reason,
+    }
+
+
+class CleanHistory:
+    """Clean log history of a bot.
+
+    The cloud returns only the latest cleans. New entries are appended to a file,
+    one compact json line per clean, and are indexed in memory by their timestamp.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str):
+        self._hass = hass
+        self.path = path
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        # sorted by timestamp, _timestamps is the index of _entries
+        self._timestamps: List[int] = []
+        self._entries: List[CleanLogEntry] = []
+
+    async def _async_load(self) -> None:
+        if self._loaded:
+            return
+
+        entries: List[CleanLogEntry] = await self._hass.async_add_executor_job(
+            _read, self.path
+        )
+        pairs = _sorted_by_timestamp(entries)
+        self._timestamps = [timestamp for timestamp, _ in pairs]
+        self._entries = [entry for _, entry in pairs]
+        self._loaded = True
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Return the timestamp of the latest clean."""
+        return self._timestamps[-1] if self._timestamps else None
+
+    async def async_add(self, logs: Iterable[CleanLogEntry]) -> List[CleanLogEntry]:
+        """Add the entries newer than the latest stored one and return them."""
+        async with self._lock:
+            await self._async_load()
+            last = self.last_timestamp
+            pairs = [
+                (timestamp, entry)
+                for timestamp, entry in _sorted_by_timestamp(logs)
+                if last is None or timestamp > last
+            ]
+            if not pairs:
+                return []
+
+            new_entries = [entry for _, entry in pairs]
+
+            await self._hass.async_add_executor_job(
+                _append, self.path, [_encode(entry) for entry in new_entries]
+            )
+            self._entries.extend(new_entries)
+            self._timestamps.extend(timestamp for timestamp, _ in pairs)
+            return new_entries
+
+    async def async_query(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> List[CleanLogEntry]:
+        """Return the cleans started in the given time range, oldest first.
+
+        :param start: unix timestamp, inclusive
+        :param end: unix timestamp, inclusive
+        """
+        async with self._lock:
+            await self._async_load()
+        low = 0 if start is None else bisect_left(self._timestamps, start)
+        high = (
+            len(self._timestamps)
+            if end is None
+            else bisect_right(self._timestamps, end)
+        )
+        return self._entries[low:high]
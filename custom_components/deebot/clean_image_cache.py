@@ -0,0 +1,232 @@
+"""Cache of the clean images."""
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import ClientError, web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import aiohttp_client
+
+from .const import CLEAN_IMAGE_DOWNLOAD_TIMEOUT, DOMAIN
+from .hub import DeebotHub
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    """Image of the cache."""
+
+    # sha256 of the image url, the images behind the urls never change
+    key: str
+    data: bytes
+
+    @property
+    def content_type(self) -> str:
+        """Return the content type of the image."""
+        if self.data.startswith(b"\xff\xd8"):
+            return "image/jpeg"
+        return "image/png"
+
+
+def _scan(directory: str) -> List[Tuple[str, int]]:
+    """Return the cached files as (key, size), least recently used first."""
+    if not os.path.isdir(directory):
+        return []
+
+    files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+    return [(name, size) for _, name, size in sorted(files)]
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+        # the modification time is the last use, to keep the order after restarts
+        os.utime(path)
+        return data
+    except FileNotFoundError:
+        return None
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+def _remove(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class CleanImageCache:
+    """Size capped disk cache of the clean images.
+
+    Each image is downloaded once and stored by the sha256 of its url. The least
+    recently used images are removed, when the cache exceeds its size.
+    """
+
+    def __init__(self, hass: HomeAssistant, directory: str, max_size: int):
+        self._hass = hass
+        self._directory = directory
+        self._max_size = max_size
+        # size by key, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size: int = 0
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self._downloads: Dict[str, "asyncio.Task[Optional[bytes]]"] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def get_key(url: str) -> str:
+        """Return the cache key of the given url."""
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._directory, key)
+
+    async def _async_load(self) -> None:
+        async with self._load_lock:
+            if self._loaded:
+                return
+
+            for key, size in await self._hass.async_add_executor_job(
+                _scan, self._directory
+            ):
+                self._entries[key] = size
+                self._size += size
+            self._loaded = True
+
+    async def async_get(self, url: str, verify_ssl: bool) -> Optional[CachedImage]:
+        """Return the image of the url and download it, if it is not cached.
+
+        :param verify_ssl: verify the certificate on download, like the hub does
+        """
+        await self._async_load()
+        key = self.get_key(url)
+        if key in self._entries:
+            data = await self._hass.async_add_executor_job(_read, self._get_path(key))
+            if data is not None:
+                self.hits += 1
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                return CachedImage(key, data)
+            # the file was removed
+            self._size -= self._entries.pop(key, 0)
+
+        self.misses += 1
+        task = self._downloads.get(key)
+        if task is None:
+            task = self._hass.async_create_task(
+                self._async_download(key, url, verify_ssl)
+            )
+            self._downloads[key] = task
+            task.add_done_callback(lambda _: self._downloads.pop(key, None))
+
+        # shielded as other requests can wait for the same download
+        data = await asyncio.shield(task)
+        return None if data is None else CachedImage(key, data)
+
+    async def _async_download(
+        self, key: str, url: str, verify_ssl: bool
+    ) -> Optional[bytes]:
+        session = aiohttp_client.async_get_clientsession(
+            self._hass, verify_ssl=verify_ssl
+        )
+        try:
+            async with session.get(
+                url, timeout=aiohttp.ClientTimeout(total=CLEAN_IMAGE_DOWNLOAD_TIMEOUT)
+            ) as response:
+                response.raise_for_status()
+                data: bytes = await response.read()
+        except (ClientError, asyncio.TimeoutError) as ex:
+            _LOGGER.warning("Could not download clean image: %s", ex)
+            return None
+
+        if len(data) > self._max_size:
+            _LOGGER.debug("Clean image is larger than the cache, not caching it")
+            return data
+
+        await self._hass.async_add_executor_job(_write, self._get_path(key), data)
+        self._size += len(data) - self._entries.pop(key, 0)
+        self._entries[key] = len(data)
+        await self._async_evict()
+        return data
+
+    async def _async_evict(self) -> None:
+        evicted = []
+        while self._size > self._max_size and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            evicted.append(self._get_path(key))
+
+        if evicted:
+            _LOGGER.debug("Evicting %d clean images from the cache", len(evicted))
+            await self._hass.async_add_executor_job(_remove, evicted)
+
+
+class DeebotCleanImageView(HomeAssistantView):  # type: ignore
+    """Serve the image of the last clean of a bot from the cache.
+
+    The sha256 of the cloud url is used as ETag, therefore repeated requests are
+    answered with 304 Not Modified until the bot cleaned again.
+    """
+
+    url = "/api/deebot/clean_image/{did}"
+    name = "api:deebot:clean_image"
+
+    def __init__(self, cache: CleanImageCache):
+        self._cache = cache
+
+    async def get(self, request: web.Request, did: str) -> web.Response:
+        """Return the image of the last clean of the given bot."""
+        hass: HomeAssistant = request.app["hass"]
+        url = None
+        verify_ssl = True
+        for hub in hass.data.get(DOMAIN, {}).values():
+            if isinstance(hub, DeebotHub) and hub.get_vacuum_bot(did) is not None:
+                url = hub.get_last_clean_image_url(did)
+                verify_ssl = hub.verify_ssl
+                break
+
+        if url is None:
+            not_found: web.Response = self.json_message(
+                "Clean image not found", HTTPStatus.NOT_FOUND
+            )
+            return not_found
+
+        etag = f'"{CleanImageCache.get_key(url)}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+        image = await self._cache.async_get(url, verify_ssl)
+        if image is None:
+            bad_gateway: web.Response = self.json_message(
+                "Clean image could not be downloaded", HTTPStatus.BAD_GATEWAY
+            )
+            return bad_gateway
+
+        return web.Response(
+            body=image.data, content_type=image.content_type, headers=headers
+        )
@@ -0,0 +1,153 @@
+"""Clean statistics module."""
+import datetime
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from deebotozmo.events import CleanLogEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import CLEAN_STATS_RETENTION, CLEAN_STATS_SAVE_DELAY
+from .storage import get_clean_stats_store
+
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+PERIOD_MONTH = "month"
+PERIODS = (PERIOD_DAY, PERIOD_WEEK, PERIOD_MONTH)
+
+_KEY_BUCKETS = "buckets"
+_KEY_LAST = "last"
+
+
+def get_period_key(period: str, timestamp: float) -> str:
+    """Return the key of the bucket containing the timestamp in local time."""
+    date: datetime.date = dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).date()
+    if period == PERIOD_DAY:
+        return date.isoformat()
+    if period == PERIOD_WEEK:
+        year, week, _ = date.isocalendar()
+        return f"{year}-W{week:02d}"
+    return f"{date.year}-{date.month:02d}"
+
+
+def _latest_buckets(
+    buckets: Dict[str, List[int]], retention: int
+) -> Dict[str, List[int]]:
+    """Return the latest buckets sorted by their key.
+
+    The keys sort chronologically, independent of the order the buckets were added.
+    """
+    return {key: buckets[key] for key in sorted(buckets)[-retention:]}
+
+
+@dataclass(frozen=True)
+class CleanTotals:
+    """Totals of the cleans in a period."""
+
+    area: int = 0
+    # in seconds
+    time: int = 0
+    runs: int = 0
+
+
+class CleanStatsAggregator:
+    """Totals of the cleans per bot and day, week and month.
+
+    Each finished clean is added to the buckets of its day, week and month. Only
+    the latest buckets per period are kept, sorted by their key. The buckets are
+    stored as [area, time, runs] lists.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store = get_clean_stats_store(hass, entry_id)
+        # bot did -> period -> period key -> [area, time, runs]
+        self._buckets: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+        # timestamp of the last added clean per bot did
+        self._last: Dict[str, int] = {}
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+
+    async def async_load(self) -> None:
+        """Load the stored statistics."""
+        data = await self._store.async_load() or {}
+        self._buckets = {
+            did: {
+                period: _latest_buckets(buckets, CLEAN_STATS_RETENTION[period])
+                for period, buckets in bot_buckets.items()
+                if period in CLEAN_STATS_RETENTION
+            }
+            for did, bot_buckets in data.get(_KEY_BUCKETS, {}).items()
+        }
+        self._last = data.get(_KEY_LAST, {})
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {_KEY_BUCKETS: self._buckets, _KEY_LAST: self._last}
+
+    def last_timestamp(self, did: str) -> Optional[int]:
+        """Return the timestamp of the last clean added for the bot."""
+        return self._last.get(did)
+
+    @callback
+    def add(self, did: str, entries: Iterable[CleanLogEntry]) -> int:
+        """Add the cleans newer than the last added one and return their number.
+
+        The entries must be sorted by timestamp.
+        """
+        added = 0
+        bot_buckets = self._buckets.setdefault(did, {})
+        for entry in entries:
+            last = self._last.get(did)
+            if entry.timestamp is None or (
+                last is not None and entry.timestamp <= last
+            ):
+                continue
+
+            for period in PERIODS:
+                buckets = bot_buckets.setdefault(period, {})
+                key = get_period_key(period, entry.timestamp)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = [0, 0, 0]
+                    bot_buckets[period] = _latest_buckets(
+                        buckets, CLEAN_STATS_RETENTION[period]
+                    )
+
+                bucket[0] += entry.area or 0
+                bucket[1] += entry.total_time or 0
+                bucket[2] += 1
+
+            self._last[did] = entry.timestamp
+            added += 1
+
+        if added:
+            self._store.async_delay_save(self._data_to_save, CLEAN_STATS_SAVE_DELAY)
+            for listener in self._listeners.get(did, []):
+                listener()
+        return added
+
+    def get_totals(
+        self, did: str, period: str, timestamp: Optional[float] = None
+    ) -> CleanTotals:
+        """Return the totals of the period containing the timestamp (default now)."""
+        if timestamp is None:
+            timestamp = dt_util.utcnow().timestamp()
+
+        bucket = (
+            self._buckets.get(did, {})
+            .get(period, {})
+            .get(get_period_key(period, timestamp))
+        )
+        return CleanTotals() if bucket is None else CleanTotals(*bucket)
+
+    @callback
+    def async_add_listener(
+        self, did: str, listener: Callable[[], None]
+    ) -> CALLBACK_TYPE:
+        """Call the listener, when cleans of the bot were added."""
+        listeners = self._listeners.setdefault(did, [])
+        listeners.append(listener)
+
+        @callback
+        def remove() -> None:
+            listeners.remove(listener)
+
+        return remove
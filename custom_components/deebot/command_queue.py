@@ -0,0 +1,174 @@
+"""Command queue module."""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from deebotozmo.commands import Command, SetCommand
+from deebotozmo.commands.custom import CustomCommand
+
+_LOGGER = logging.getLogger(__name__)
+
+CommandType = Union[Command, CustomCommand]
+
+
+class TokenBucket:
+    """Token bucket, which allows bursts up to its capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        # tokens added per second
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    def delay(self) -> float:
+        """Return the seconds until a token is available."""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+    def consume(self) -> None:
+        """Take a token."""
+        self._refill()
+        self._tokens -= 1
+
+
+Response = Dict[str, Any]
+
+
+class _QueuedCommand:
+    __slots__ = ("command", "futures")
+
+    def __init__(self, command: CommandType, future: "asyncio.Future[Response]"):
+        self.command = command
+        # callers waiting for the command, including the ones of superseded commands
+        self.futures: List["asyncio.Future[Response]"] = [future]
+
+    def set_result(
+        self, response: Response, exception: Optional[BaseException] = None
+    ) -> None:
+        """Pass the response or the exception to the waiting callers."""
+        for future in self.futures:
+            if future.done():
+                # the caller was cancelled
+                continue
+            if exception is None:
+                future.set_result(response)
+            else:
+                future.set_exception(exception)
+
+
+def _get_key(command: CommandType) -> Any:
+    if isinstance(command, SetCommand):
+        # a set command only changes a setting, the last value wins
+        return command.name
+    # actions (ex. clean start, pause or spot area all named "clean") and custom
+    # commands with an unknown effect are never merged
+    return command
+
+
+class CommandQueue:
+    """Queue of the commands for one bot.
+
+    The commands are sent one after another, limited by a token bucket. A queued
+    set command is replaced by a later one of the same kind (ex. only the last set
+    fan speed is sent) and the callers of both wait for the later one.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[CommandType], Awaitable[Response]],
+        rate: float,
+        burst: int,
+    ):
+        self._execute = execute
+        self._bucket = TokenBucket(rate, burst)
+        # queued commands by key in send order
+        self._pending: Dict[Any, _QueuedCommand] = {}
+        self._sending: Optional[_QueuedCommand] = None
+        self._worker: Optional["asyncio.Task[None]"] = None
+        self.sent: int = 0
+        # commands replaced by a later one before they were sent
+        self.dropped: int = 0
+        # number of times the queue waited for the rate limit
+        self.throttled: int = 0
+
+    @property
+    def depth(self) -> int:
+        """Return the number of queued commands."""
+        return len(self._pending)
+
+    async def async_execute(self, command: CommandType) -> Response:
+        """Queue the command and return the response of it or its replacement."""
+        future: "asyncio.Future[Response]" = asyncio.get_running_loop().create_future()
+        key = _get_key(command)
+        queued = self._pending.pop(key, None)
+        if queued is None:
+            queued = _QueuedCommand(command, future)
+        else:
+            _LOGGER.debug("Command %s replaced by a later one", command.name)
+            self.dropped += 1
+            queued.command = command
+            queued.futures.append(future)
+        # (re)insert at the end to keep the order in which the commands were issued
+        self._pending[key] = queued
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._async_work())
+        return await future
+
+    async def _async_work(self) -> None:
+        try:
+            while self._pending:
+                delay = self._bucket.delay()
+                if delay > 0:
+                    self.throttled += 1
+                    await asyncio.sleep(delay)
+                self._bucket.consume()
+
+                key = next(iter(self._pending))
+                self._sending = self._pending.pop(key)
+                try:
+                    response = await self._execute(self._sending.command)
+                except Exception as ex:  # pylint: disable=broad-except
+                    self._sending.set_result({}, ex)
+                else:
+                    self._sending.set_result(response)
+                self._sending = None
+                self.sent += 1
+        finally:
+            if self._worker is asyncio.current_task():
+                self._worker = None
+
+    def cancel(self) -> None:
+        """Cancel all queued commands."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+        queued_commands = list(self._pending.values())
+        if self._sending is not None:
+            queued_commands.append(self._sending)
+            self._sending = None
+        self._pending.clear()
+        for queued in queued_commands:
+            for future in queued.futures:
+                future.cancel()
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the metrics of the queue as dict."""
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "throttled": self.throttled,
+        }
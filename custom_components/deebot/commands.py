@@ -0,0 +1,255 @@
+"""Commands module."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from deebotozmo.commands import (
+    Charge,
+    Clean,
+    Command,
+    GetBattery,
+    GetCachedMapInfo,
+    GetChargeState,
+    GetCleanInfo,
+    GetCleanLogs,
+    GetError,
+    GetFanSpeed,
+    GetLifeSpan,
+    GetMajorMap,
+    GetMapTrace,
+    GetPos,
+    GetStats,
+    GetWaterInfo,
+    PlaySound,
+    SetFanSpeed,
+    SetRelocationState,
+    SetWaterInfo,
+)
+from deebotozmo.commands.clean import CleanAction, CleanArea, CleanMode
+from deebotozmo.commands.custom import CustomCommand
+
+from .bot import TrackedVacuumBot
+from .const import (
+    EVENT_BATTERY,
+    EVENT_CLEAN_LOGS,
+    EVENT_ERROR,
+    EVENT_FAN_SPEED,
+    EVENT_LIFE_SPAN,
+    EVENT_MAP,
+    EVENT_ROOMS,
+    EVENT_STATS,
+    EVENT_STATUS,
+    EVENT_WATER,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _get_area_command(
+    mode: CleanMode, area_key: str, params: Dict[str, Any]
+) -> CleanArea:
+    return CleanArea(
+        mode=mode, area=str(params[area_key]), cleanings=params.get("cleanings", 1)
+    )
+
+
+# Commands without params by their name
+_COMMANDS: Dict[str, Callable[[], Command]] = {
+    "start": lambda: Clean(CleanAction.START),
+    "clean": lambda: Clean(CleanAction.START),
+    "stop": lambda: Clean(CleanAction.STOP),
+    "pause": lambda: Clean(CleanAction.PAUSE),
+    "charge": Charge,
+    "return_to_base": Charge,
+    "locate": PlaySound,
+    "relocate": SetRelocationState,
+    SetRelocationState.name: SetRelocationState,
+}
+
+# Commands, which require params, by their name
+_PARAMS_COMMANDS: Dict[str, Callable[[Dict[str, Any]], Command]] = {
+    "spot_area": lambda params: _get_area_command(CleanMode.SPOT_AREA, "rooms", params),
+    "custom_area": lambda params: _get_area_command(
+        CleanMode.CUSTOM_AREA, "coordinates", params
+    ),
+    "set_water": lambda params: SetWaterInfo(params["amount"]),
+    "set_fan_speed": lambda params: SetFanSpeed(params["fan_speed"]),
+}
+
+
+def get_command(
+    command: str, params: Optional[Dict[str, Any]] = None
+) -> Union[Command, CustomCommand]:
+    """Return the deebotozmo command for the given command name and params.
+
+    Unknown command names are sent as custom command.
+    """
+    if command in _COMMANDS:
+        return _COMMANDS[command]()
+
+    if command in _PARAMS_COMMANDS:
+        if params is None:
+            raise RuntimeError("Params are required!")
+        return _PARAMS_COMMANDS[command](params)
+
+    return CustomCommand(command, params)
+
+
+@dataclass(frozen=True)
+class RefreshPart:
+    """Commands to refresh a part of the bot."""
+
+    # name of the event emitter of the bot
+    event_name: str
+    commands: Tuple[Type[Command], ...]
+
+
+# Same commands as used by the event emitters of deebotozmo
+REFRESH_PARTS: Dict[str, RefreshPart] = {
+    EVENT_STATUS: RefreshPart("status", (GetChargeState, GetCleanInfo)),
+    EVENT_ERROR: RefreshPart("error", (GetError,)),
+    EVENT_FAN_SPEED: RefreshPart("fan_speed", (GetFanSpeed,)),
+    EVENT_CLEAN_LOGS: RefreshPart("clean_logs", (GetCleanLogs,)),
+    EVENT_WATER: RefreshPart("water_info", (GetWaterInfo,)),
+    EVENT_BATTERY: RefreshPart("battery", (GetBattery,)),
+    EVENT_STATS: RefreshPart("stats", (GetStats,)),
+    EVENT_LIFE_SPAN: RefreshPart("lifespan", (GetLifeSpan,)),
+    EVENT_ROOMS: RefreshPart("rooms", (GetCachedMapInfo,)),
+    EVENT_MAP: RefreshPart("map", (GetMapTrace, GetPos, GetMajorMap)),
+}
+
+REFRESH_RESULT_OK = "ok"
+REFRESH_RESULT_FAILED = "failed"
+# nothing is subscribed to the part, like the emitters of deebotozmo do
+REFRESH_RESULT_SKIPPED = "skipped"
+
+
+async def _async_refresh_part(vacuum_bot: TrackedVacuumBot, part: str) -> bool:
+    responses = await asyncio.gather(
+        *[
+            vacuum_bot.execute_command_with_response(command_class())
+            for command_class in REFRESH_PARTS[part].commands
+        ]
+    )
+    return all(response.get("ret") == "ok" for response in responses)
+
+
+async def async_refresh(
+    vacuum_bot: TrackedVacuumBot, parts: Iterable[str]
+) -> Dict[str, str]:
+    """Refresh the given parts of the bot and return the result per part.
+
+    A part, which is already refreshing, is not requested again. The running
+    refresh is awaited instead.
+    """
+    tasks: Dict[str, "asyncio.Task[bool]"] = {}
+    results: Dict[str, str] = {}
+    for part in parts:
+        if part in tasks or part in results:
+            continue
+
+        emitter = getattr(vacuum_bot.events, REFRESH_PARTS[part].event_name)
+        if not emitter.has_subscribers:
+            results[part] = REFRESH_RESULT_SKIPPED
+            continue
+
+        task = vacuum_bot.refresh_tasks.get(part)
+        if task is None:
+            task = asyncio.create_task(_async_refresh_part(vacuum_bot, part))
+            vacuum_bot.refresh_tasks[part] = task
+
+            def remove(done: "asyncio.Task[bool]", part: str = part) -> None:
+                if vacuum_bot.refresh_tasks.get(part) is done:
+                    del vacuum_bot.refresh_tasks[part]
+
+            task.add_done_callback(remove)
+        else:
+            _LOGGER.debug("Refresh of %s is already running", part)
+        tasks[part] = task
+
+    # shielded as other callers can wait for the same refresh
+    done = await asyncio.gather(
+        *[asyncio.shield(task) for task in tasks.values()], return_exceptions=True
+    )
+    for part, success in zip(tasks, done):
+        if isinstance(success, Exception):
+            _LOGGER.warning("Refresh of %s failed: %s", part, success)
+        results[part] = REFRESH_RESULT_OK if success is True else REFRESH_RESULT_FAILED
+    return results
+
+
+@dataclass
+class FleetCommandResult:
+    """Result of a command sent to one bot of the fleet."""
+
+    did: str
+    success: bool
+    # seconds until the bot answered or the command failed
+    duration: float
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the result as dict."""
+        return {
+            "success": self.success,
+            "duration_ms": round(self.duration * 1000),
+            "error": self.error,
+        }
+
+
+async def _async_execute(
+    vacuum_bot: TrackedVacuumBot,
+    command: str,
+    params: Optional[Dict[str, Any]],
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+) -> FleetCommandResult:
+    did = vacuum_bot.vacuum.did
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            # each bot needs its own instance, the bots may modify it
+            response = await asyncio.wait_for(
+                vacuum_bot.execute_command_with_response(get_command(command, params)),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            return FleetCommandResult(did, False, time.monotonic() - start, "timeout")
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.warning("Command %s failed for %s: %s", command, did, ex)
+            return FleetCommandResult(did, False, time.monotonic() - start, str(ex))
+
+    duration = time.monotonic() - start
+    if response.get("ret") == "ok":
+        return FleetCommandResult(did, True, duration)
+    return FleetCommandResult(
+        did, False, duration, str(response.get("error", "no response"))
+    )
+
+
+async def async_execute_fleet_command(
+    vacuum_bots: Iterable[TrackedVacuumBot],
+    command: str,
+    params: Optional[Dict[str, Any]],
+    max_concurrency: int,
+    timeout: float,
+) -> List[FleetCommandResult]:
+    """Send the command to all given bots concurrently and return the results.
+
+    At most max_concurrency commands are in flight at the same time and each
+    bot has timeout seconds to answer.
+    """
+    # fail fast on invalid params instead of once per bot
+    get_command(command, params)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    return list(
+        await asyncio.gather(
+            *[
+                _async_execute(vacuum_bot, command, params, semaphore, timeout)
+                for vacuum_bot in vacuum_bots
+            ]
+        )
+    )
@@ -18,17 +18,34 @@ from homeassistant.const import (
     CONF_USERNAME,
     CONF_VERIFY_SSL,
 )
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import aiohttp_client
 
 from .const import (
     BUMPER_CONFIGURATION,
+    CONF_BACKGROUND_SETUP,
+    CONF_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
     CONF_CLIENT_DEVICE_ID,
     CONF_CONTINENT,
     CONF_COUNTRY,
+    CONF_LIFE_SPAN_REFRESH_INTERVAL,
+    CONF_MAP_IMAGE_FORMAT,
+    CONF_MAP_STREAM_MAX_FPS,
     CONF_MODE_BUMPER,
     CONF_MODE_CLOUD,
+    CONF_MQTT_SILENCE_THRESHOLD,
+    CONF_ROOMS_REFRESH_INTERVAL,
+    CONF_STATE_WRITE_COALESCE_DELAY,
+    DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    DEFAULT_LIFE_SPAN_REFRESH_INTERVAL,
+    DEFAULT_MAP_IMAGE_FORMAT,
+    DEFAULT_MAP_STREAM_MAX_FPS,
+    DEFAULT_MQTT_SILENCE_THRESHOLD,
+    DEFAULT_ROOMS_REFRESH_INTERVAL,
+    DEFAULT_STATE_WRITE_COALESCE_DELAY,
     DOMAIN,
+    MAP_IMAGE_FORMATS,
 )
 from .helpers import get_bumper_device_id
 
@@ -169,3 +186,83 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):  # type: ignore
         return self.async_show_form(
             step_id="robots", data_schema=options_schema, errors=errors
         )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):  # type: ignore
+    """Handle the options for Deebot."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry):
+        self._config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_BACKGROUND_SETUP,
+                    default=self._config_entry.options.get(
+                        CONF_BACKGROUND_SETUP, False
+                    ),
+                ): bool,
+                vol.Required(
+                    CONF_LIFE_SPAN_REFRESH_INTERVAL,
+                    default=self._config_entry.options.get(
+                        CONF_LIFE_SPAN_REFRESH_INTERVAL,
+                        DEFAULT_LIFE_SPAN_REFRESH_INTERVAL,
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_ROOMS_REFRESH_INTERVAL,
+                    default=self._config_entry.options.get(
+                        CONF_ROOMS_REFRESH_INTERVAL, DEFAULT_ROOMS_REFRESH_INTERVAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                    default=self._config_entry.options.get(
+                        CONF_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                        DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Required(
+                    CONF_MQTT_SILENCE_THRESHOLD,
+                    default=self._config_entry.options.get(
+                        CONF_MQTT_SILENCE_THRESHOLD, DEFAULT_MQTT_SILENCE_THRESHOLD
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_MAP_IMAGE_FORMAT,
+                    default=self._config_entry.options.get(
+                        CONF_MAP_IMAGE_FORMAT, DEFAULT_MAP_IMAGE_FORMAT
+                    ),
+                ): vol.In(MAP_IMAGE_FORMATS),
+                vol.Required(
+                    CONF_MAP_STREAM_MAX_FPS,
+                    default=self._config_entry.options.get(
+                        CONF_MAP_STREAM_MAX_FPS, DEFAULT_MAP_STREAM_MAX_FPS
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=10)),
+                vol.Required(
+                    CONF_STATE_WRITE_COALESCE_DELAY,
+                    default=self._config_entry.options.get(
+                        CONF_STATE_WRITE_COALESCE_DELAY,
+                        DEFAULT_STATE_WRITE_COALESCE_DELAY,
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=options_schema)
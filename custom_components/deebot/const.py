@@ -36,6 +36,14 @@ CONF_BUMPER = "Bumper"
 CONF_MODE_BUMPER = CONF_BUMPER
 CONF_MODE_CLOUD = "Cloud (recommended)"
 CONF_CLIENT_DEVICE_ID = "client_device_id"
+CONF_BACKGROUND_SETUP = "background_setup"
+CONF_LIFE_SPAN_REFRESH_INTERVAL = "life_span_refresh_interval"
+CONF_ROOMS_REFRESH_INTERVAL = "rooms_refresh_interval"
+CONF_CIRCUIT_BREAKER_FAILURE_THRESHOLD = "circuit_breaker_failure_threshold"
+CONF_MAP_IMAGE_FORMAT = "map_image_format"
+CONF_MAP_STREAM_MAX_FPS = "map_stream_max_fps"
+CONF_STATE_WRITE_COALESCE_DELAY = "state_write_coalesce_delay"
+CONF_MQTT_SILENCE_THRESHOLD = "mqtt_silence_threshold"
 
 # Bumper has no auth and serves the urls for all countries/continents
 BUMPER_CONFIGURATION = {
@@ -48,6 +56,14 @@ BUMPER_CONFIGURATION = {
 
 DEEBOT_DEVICES = f"{DOMAIN}_devices"
 
+# Key of the shared MQTT connection manager in hass.data[DOMAIN]
+DATA_MQTT = "mqtt"
+# Key of the running profiler session in hass.data[DOMAIN]
+DATA_PROFILER = "profiler"
+# Set in hass.data once the diagnostics view is registered
+DATA_DIAGNOSTICS_VIEW = f"{DOMAIN}_diagnostics_view"
+DATA_CLEAN_IMAGE_CACHE = f"{DOMAIN}_clean_image_cache"
+
 VACUUMSTATE_TO_STATE = {
     VacuumState.IDLE: STATE_IDLE,
     VacuumState.CLEANING: STATE_CLEANING,
@@ -71,3 +87,83 @@ EVENT_ROOMS = "Rooms"
 EVENT_MAP = "Map"
 
 EVENT_CUSTOM_COMMAND = "deebot_custom_command"
+EVENT_REPLAY_FINISHED = "deebot_replay_finished"
+EVENT_PROFILE_FINISHED = "deebot_profile_finished"
+EVENT_FLEET_COMMAND_FINISHED = "deebot_fleet_command_finished"
+EVENT_REFRESH_FINISHED = "deebot_refresh_finished"
+EVENT_CLEAN_HISTORY = "deebot_clean_history"
+
+# Window in seconds, in which state writes of an entity are merged into one.
+# 0 merges all writes requested in the same event loop iteration, which keeps
+# the states current. A larger window, which can be set in the options, trades
+# latency for fewer writes on busy fleets
+DEFAULT_STATE_WRITE_COALESCE_DELAY = 0.0
+
+# Rendered map images kept per camera
+MAP_CACHE_MAX_ENTRIES = 8
+MAP_CACHE_MAX_BYTES = 4 * 1024 * 1024
+MAP_RENDER_MAX_CONCURRENCY = 2
+# Format of the map camera images and the maximum frames per second pushed to
+# the live map stream, both can be changed in the options.
+# The stream is always sent as jpeg, as only jpeg is supported by MJPEG clients
+MAP_IMAGE_FORMATS = ("png", "jpeg", "webp")
+DEFAULT_MAP_IMAGE_FORMAT = "png"
+DEFAULT_MAP_STREAM_MAX_FPS = 1.0
+MAP_STREAM_IMAGE_FORMAT = "jpeg"
+
+# Cloud status polling, the failure threshold can be changed in the options
+STATUS_POLL_INTERVAL = 60
+DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD = 3
+CIRCUIT_BREAKER_MAX_DELAY = 3600
+CIRCUIT_BREAKER_JITTER = 0.2
+# Bots heard from over MQTT within this time (in seconds) are considered available
+# and not polled, can be changed in the options. 0 polls all bots
+DEFAULT_MQTT_SILENCE_THRESHOLD = 180
+
+STORAGE_VERSION = 1
+# Ecovacs doesn't return the token lifetime, therefore a conservative value is used
+AUTH_TOKEN_LIFETIME = 3 * 24 * 60 * 60
+# Tokens are refreshed in the background this long before they expire
+AUTH_TOKEN_REFRESH_MARGIN = 12 * 60 * 60
+AUTH_TOKEN_REFRESH_RETRY_DELAY = 10 * 60
+
+# Maximum number of bots, which are subscribed at the same time during setup
+SETUP_MAX_CONCURRENCY = 10
+
+# Background refreshes, the intervals are in minutes and can be changed in the options
+DEFAULT_LIFE_SPAN_REFRESH_INTERVAL = 60
+DEFAULT_ROOMS_REFRESH_INTERVAL = 6 * 60
+REFRESH_SCHEDULER_INTERVAL = 60
+# Relative deviation of the refresh times to spread the refreshes of the bots
+REFRESH_JITTER = 0.1
+# Parts, which are refreshed when a bot finished cleaning
+REFRESH_AFTER_CLEANING = (EVENT_STATS, EVENT_CLEAN_LOGS)
+# The cloud needs some time to update the stats and clean logs
+REFRESH_AFTER_CLEANING_DELAY = 30
+
+# Rate limit of the commands sent to a bot, get commands are not limited
+COMMAND_RATE_LIMIT = 1  # commands per second
+COMMAND_BURST = 5
+
+# Defaults of the fleet command service
+FLEET_COMMAND_MAX_CONCURRENCY = 10
+FLEET_COMMAND_TIMEOUT = 30
+
+# Directory in the config folder for the recordings of bot messages
+RECORDINGS_DIR = "deebot_recordings"
+RECORDER_FLUSH_INTERVAL = 5
+
+# Directory in the storage folder for the clean histories of the bots
+CLEAN_HISTORY_DIR = "deebot_clean_history"
+
+# Directory in the storage folder for the cached clean images
+CLEAN_IMAGE_CACHE_DIR = "deebot_clean_images"
+CLEAN_IMAGE_CACHE_MAX_SIZE = 50 * 1024 * 1024  # bytes
+CLEAN_IMAGE_DOWNLOAD_TIMEOUT = 30
+
+# Number of buckets kept per period of the clean statistics
+CLEAN_STATS_RETENTION = {"day": 31, "week": 12, "month": 12}
+CLEAN_STATS_SAVE_DELAY = 10
+
+# Directory in the config folder for the profiles written by the profile service
+PROFILES_DIR = "deebot_profiles"
@@ -0,0 +1,160 @@
+"""Diagnostics support for Deebot."""
+import json
+import time
+from http import HTTPStatus
+from typing import Any, Dict, Mapping
+
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_DEVICES, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import Unauthorized
+from homeassistant.helpers.json import JSONEncoder
+from homeassistant.util import slugify
+
+from .bot import TrackedVacuumBot
+from .const import CONF_CLIENT_DEVICE_ID, DATA_CLEAN_IMAGE_CACHE, DOMAIN
+from .hub import DeebotHub
+
+# Credentials and identifiers, which are redacted wherever they appear as key
+TO_REDACT = {
+    CONF_CLIENT_DEVICE_ID,
+    CONF_DEVICES,
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    "did",
+    "name",
+    "resource",
+    "token",
+    "user_id",
+    "uid",
+}
+REDACTED = "**REDACTED**"
+
+
+def _redact(data: Any, aliases: Mapping[str, str]) -> Any:
+    """Redact the credentials and replace the identifiers with their alias.
+
+    The identifiers are replaced also inside of keys and values like entity ids.
+    """
+    if isinstance(data, Mapping):
+        return {
+            _redact(key, aliases): REDACTED
+            if key in TO_REDACT
+            else _redact(value, aliases)
+            for key, value in data.items()
+        }
+    if isinstance(data, (list, tuple)):
+        return [_redact(value, aliases) for value in data]
+    if isinstance(data, str):
+        for identifier, alias in aliases.items():
+            data = data.replace(identifier, alias)
+    return data
+
+
+def _get_aliases(hub: DeebotHub, config_entry: ConfigEntry) -> Dict[str, str]:
+    """Return the identifiers of the bots and the client with their alias."""
+    aliases: Dict[str, str] = {}
+    client_device_id = config_entry.data.get(CONF_CLIENT_DEVICE_ID)
+    if client_device_id:
+        aliases[client_device_id] = REDACTED
+    for index, vacuum_bot in enumerate(hub.vacuum_bots, 1):
+        for identifier in (vacuum_bot.vacuum.did, vacuum_bot.vacuum.name):
+            if identifier:
+                aliases[identifier] = f"bot_{index}"
+                aliases[slugify(identifier)] = f"bot_{index}"
+    # replace longer identifiers first, in case they contain a shorter one
+    return dict(sorted(aliases.items(), key=lambda item: -len(item[0])))
+
+
+def _get_bot_diagnostics(
+    hub: DeebotHub, vacuum_bot: TrackedVacuumBot
+) -> Dict[str, Any]:
+    did = vacuum_bot.vacuum.did
+    last_seen = vacuum_bot.last_seen
+    return {
+        "name": vacuum_bot.vacuum.name,
+        "model": vacuum_bot.vacuum.get("deviceName"),
+        "fw_version": vacuum_bot.fw_version,
+        "last_seen_seconds_ago": None
+        if last_seen is None
+        else round(time.monotonic() - last_seen, 1),
+        "command_queue": vacuum_bot.command_queue.as_dict(),
+        "map_renderer": None
+        if did not in hub.map_renderers
+        else hub.map_renderers[did].as_dict(),
+        "events": {
+            event_name: metrics.as_dict()
+            for event_name, metrics in sorted(hub.dispatcher.get_metrics(did).items())
+        },
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    hub: DeebotHub = hass.data[DOMAIN][config_entry.entry_id]
+    data = {
+        "config_entry": dict(config_entry.data),
+        "options": dict(config_entry.options),
+        "cloud": {
+            "state": hub.circuit_breaker.state.value,
+            "failures": hub.circuit_breaker.failures,
+            "trips": hub.circuit_breaker.trips,
+        },
+        "clean_image_cache": {
+            "hits": hass.data[DATA_CLEAN_IMAGE_CACHE].hits,
+            "misses": hass.data[DATA_CLEAN_IMAGE_CACHE].misses,
+        },
+        "background_refresh": {
+            "refreshes": hub.refresh_scheduler.refreshes,
+            "skipped": hub.refresh_scheduler.skipped,
+        },
+        "bots": {
+            vacuum_bot.vacuum.did: _get_bot_diagnostics(hub, vacuum_bot)
+            for vacuum_bot in hub.vacuum_bots
+        },
+        "state_writes": {
+            entity_id: {
+                "writes": state_writer.writes,
+                "saved_writes": state_writer.saved_writes,
+            }
+            for entity_id, state_writer in sorted(hub.state_writers.items())
+        },
+    }
+    redacted: Dict[str, Any] = _redact(data, _get_aliases(hub, config_entry))
+    return redacted
+
+
+class DeebotDiagnosticsView(HomeAssistantView):  # type: ignore
+    """Download the diagnostics of a config entry as json file.
+
+    Home Assistant provides no diagnostics platform yet.
+    """
+
+    url = "/api/deebot/diagnostics/{entry_id}"
+    name = "api:deebot:diagnostics"
+
+    async def get(self, request: web.Request, entry_id: str) -> web.Response:
+        """Return the diagnostics of the given config entry."""
+        if not request["hass_user"].is_admin:
+            raise Unauthorized()
+
+        hass: HomeAssistant = request.app["hass"]
+        config_entry = hass.config_entries.async_get_entry(entry_id)
+        if config_entry is None or entry_id not in hass.data.get(DOMAIN, {}):
+            not_found: web.Response = self.json_message(
+                "Config entry not found", HTTPStatus.NOT_FOUND
+            )
+            return not_found
+
+        data = await async_get_config_entry_diagnostics(hass, config_entry)
+        return web.Response(
+            body=json.dumps(data, indent=2, cls=JSONEncoder),
+            content_type="application/json",
+            headers={
+                "Content-Disposition": f'attachment; filename="{DOMAIN}-{entry_id}.json"'
+            },
+        )
@@ -0,0 +1,165 @@
+"""Event dispatcher module."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from deebotozmo.event_emitter import EventEmitter, EventListener
+from deebotozmo.vacuum_bot import VacuumBot
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .metrics import EventMetrics
+from .profiler import profile_coroutine
+from .recorder import is_replaying
+
+_LOGGER = logging.getLogger(__name__)
+
+EventCallback = Callable[[Any], Awaitable[None]]
+# (bot did, event name)
+RouteKey = Tuple[str, str]
+
+
+@dataclass
+class HandlerTiming:
+    """Timing of an event handler."""
+
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, duration: float) -> None:
+        """Add the duration of a call."""
+        self.calls += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+
+def _get_handler_name(event_callback: EventCallback) -> str:
+    # ex. DeebotVacuum.async_added_to_hass.<locals>.on_battery -> DeebotVacuum.on_battery
+    name: str = getattr(event_callback, "__qualname__", repr(event_callback))
+    return name.replace(".async_added_to_hass.<locals>", "")
+
+
+class EventDispatcher:
+    """Route bot events to the interested entities.
+
+    The dispatcher holds only one subscription per bot and event type and
+    forwards each event to all callbacks registered for it.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._routes: Dict[RouteKey, Tuple[EventCallback, ...]] = {}
+        self._listeners: Dict[RouteKey, EventListener] = {}
+        self._last_events: Dict[RouteKey, Any] = {}
+        # Kept after unsubscribing to not lose the history on entity reloads
+        self._metrics: Dict[RouteKey, EventMetrics] = {}
+        # Timings per handler name, only collected if set
+        self.handler_timings: Optional[Dict[str, HandlerTiming]] = None
+
+    @callback
+    def subscribe(
+        self, vacuum_bot: VacuumBot, event_name: str, event_callback: EventCallback
+    ) -> CALLBACK_TYPE:
+        """Subscribe to the given event of the bot and return the unsubscribe function.
+
+        :param event_name: attribute name of the event on VacuumBot.events
+        """
+        key = (vacuum_bot.vacuum.did, event_name)
+        self._routes[key] = self._routes.get(key, ()) + (event_callback,)
+
+        if key in self._last_events:
+            asyncio.create_task(self._call(key, event_callback, self._last_events[key]))
+
+        if key not in self._listeners:
+            # the emitter notifies the new listener with the last event itself
+            emitter: EventEmitter = getattr(vacuum_bot.events, event_name)
+            self._listeners[key] = emitter.subscribe(self._get_router(key))
+
+        @callback
+        def unsubscribe() -> None:
+            callbacks = list(self._routes.get(key, ()))
+            if event_callback in callbacks:
+                callbacks.remove(event_callback)
+
+            if callbacks:
+                self._routes[key] = tuple(callbacks)
+            else:
+                self._remove_route(key)
+
+        return unsubscribe
+
+    def _get_router(self, key: RouteKey) -> EventCallback:
+        async def route(event: Any) -> None:
+            self._last_events[key] = event
+            metrics = self._get_metrics(key)
+            metrics.events += 1
+            if not is_replaying():
+                metrics.last_received = time.monotonic()
+            for event_callback in self._routes.get(key, ()):
+                await self._call(key, event_callback, event)
+
+        return route
+
+    async def _call(
+        self, key: RouteKey, event_callback: EventCallback, event: Any
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            await profile_coroutine(self._hass, event_callback(event))
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.error(
+                "Error handling %s event of %s", key[1], key[0], exc_info=True
+            )
+
+        duration = time.perf_counter() - start
+        self._get_metrics(key).latency.add(duration)
+        if self.handler_timings is not None:
+            self.handler_timings.setdefault(
+                _get_handler_name(event_callback), HandlerTiming()
+            ).add(duration)
+
+    def _get_metrics(self, key: RouteKey) -> EventMetrics:
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            metrics = self._metrics[key] = EventMetrics()
+        return metrics
+
+    def get_metrics(self, did: str) -> Dict[str, EventMetrics]:
+        """Return the metrics per event name of the given bot."""
+        return {
+            event_name: metrics
+            for (metrics_did, event_name), metrics in self._metrics.items()
+            if metrics_did == did
+        }
+
+    def last_received(self, did: str, event_name: str) -> Optional[float]:
+        """Return the monotonic timestamp of the last event received from the bot."""
+        metrics = self._metrics.get((did, event_name))
+        return None if metrics is None else metrics.last_received
+
+    def _remove_route(self, key: RouteKey) -> None:
+        self._routes.pop(key, None)
+        self._last_events.pop(key, None)
+        listener = self._listeners.pop(key, None)
+        if listener is not None:
+            listener.unsubscribe()
+
+    @callback
+    def restore(self, vacuum_bot: VacuumBot, event_name: str, event: Any) -> None:
+        """Set the last event, which is passed to subscribers until the bot sends one."""
+        self._last_events.setdefault((vacuum_bot.vacuum.did, event_name), event)
+
+    def last_events(self, did: str) -> Dict[str, Any]:
+        """Return the last event per event name of the given bot."""
+        return {
+            event_name: event
+            for (event_did, event_name), event in self._last_events.items()
+            if event_did == did
+        }
+
+    def unsubscribe_all(self) -> None:
+        """Remove all routes and subscriptions."""
+        for key in list(self._listeners):
+            self._remove_route(key)
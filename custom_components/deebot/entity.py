@@ -0,0 +1,108 @@
+"""Entity module."""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+
+from .bot import TrackedVacuumBot
+from .const import DEFAULT_STATE_WRITE_COALESCE_DELAY
+from .hub import DeebotHub
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StateWriteCoalescer:
+    """Merge state write requests into a single write.
+
+    All requests made in the same loop iteration (or inside the given delay window)
+    result in one call of the write function.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        write_state: Callable[[], None],
+        delay: float = DEFAULT_STATE_WRITE_COALESCE_DELAY,
+    ):
+        self._loop = loop
+        self._write_state = write_state
+        self._delay = delay
+        self._handle: Optional[asyncio.Handle] = None
+        self.writes: int = 0
+        self.saved_writes: int = 0
+
+    @callback
+    def async_schedule(self) -> None:
+        """Schedule a state write, if none is pending."""
+        if self._handle is not None:
+            self.saved_writes += 1
+            return
+
+        if self._delay > 0:
+            self._handle = self._loop.call_later(self._delay, self._write)
+        else:
+            self._handle = self._loop.call_soon(self._write)
+
+    @callback
+    def _write(self) -> None:
+        self._handle = None
+        self.writes += 1
+        self._write_state()
+
+    @callback
+    def cancel(self) -> None:
+        """Cancel pending write."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+
+class DeebotEntity(Entity):  # type: ignore
+    """Deebot base entity, which coalesces state writes."""
+
+    _state_writer: StateWriteCoalescer
+
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot):
+        super().__init__()
+        self._hub: DeebotHub = hub
+        self._vacuum_bot: TrackedVacuumBot = vacuum_bot
+
+    async def async_added_to_hass(self) -> None:
+        """Set up the state write coalescer now that hass is ready."""
+        await super().async_added_to_hass()
+
+        self._state_writer = StateWriteCoalescer(
+            self.hass.loop, self.async_write_ha_state, self._hub.state_write_delay
+        )
+        self._hub.state_writers[self.entity_id] = self._state_writer
+
+        def on_remove() -> None:
+            self._state_writer.cancel()
+            self._hub.state_writers.pop(self.entity_id, None)
+            _LOGGER.debug(
+                "%s: %d state writes, %d saved by coalescing",
+                self.entity_id,
+                self._state_writer.writes,
+                self._state_writer.saved_writes,
+            )
+
+        self.async_on_remove(on_remove)
+
+    @callback
+    def async_schedule_write_ha_state(self) -> None:
+        """Schedule a coalesced state write."""
+        self._state_writer.async_schedule()
+
+    @callback
+    def _subscribe(
+        self, event_name: str, event_callback: Callable[[Any], Awaitable[None]]
+    ) -> None:
+        """Subscribe to an event of the bot through the hub dispatcher.
+
+        The subscription is removed together with the entity.
+        """
+        self.async_on_remove(
+            self._hub.dispatcher.subscribe(self._vacuum_bot, event_name, event_callback)
+        )
@@ -1,10 +1,12 @@
 """Helpers module."""
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
 
-from deebotozmo.models import Vacuum
+from deebotozmo.models import Room, Vacuum
 from deebotozmo.vacuum_bot import VacuumBot
 from homeassistant.core import HomeAssistant
-from homeassistant.util import uuid
+from homeassistant.util import slugify, uuid
 
 from .const import DOMAIN
 
@@ -38,3 +40,58 @@ def get_bumper_device_id(hass: HomeAssistant) -> str:
     except Exception:  # pylint: disable=broad-except
         location_name = ""
     return f"Deebot-4-HA_{location_name}_{uuid.random_uuid_hex()[:4]}"
+
+
+@dataclass(frozen=True)
+class RoomIndex:
+    """Immutable room lookup, which is built once per rooms event."""
+
+    # slugified room name -> ids of all rooms with this name
+    ids_by_name: Mapping[str, Tuple[int, ...]] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+    room_by_id: Mapping[int, Room] = field(default_factory=lambda: MappingProxyType({}))
+    # state attributes ("room_<slug>" -> id or tuple of ids)
+    attributes: Mapping[str, Union[int, Tuple[int, ...]]] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+
+    @classmethod
+    def from_rooms(cls, rooms: Sequence[Room]) -> "RoomIndex":
+        """Create index from the given rooms."""
+        ids_by_name: Dict[str, Tuple[int, ...]] = {}
+        room_by_id: Dict[int, Room] = {}
+        for room in rooms:
+            # convert room name to snake_case to meet the convention
+            room_name = slugify(room.subtype)
+            ids_by_name[room_name] = ids_by_name.get(room_name, ()) + (room.id,)
+            room_by_id[room.id] = room
+
+        attributes: Dict[str, Union[int, Tuple[int, ...]]] = {}
+        for room_name, ids in ids_by_name.items():
+            attributes["room_" + room_name] = ids[0] if len(ids) == 1 else ids
+
+        return cls(
+            MappingProxyType(ids_by_name),
+            MappingProxyType(room_by_id),
+            MappingProxyType(attributes),
+        )
+
+    def resolve(self, rooms: Union[int, str]) -> str:
+        """Return the comma separated room ids of the given ids or room names.
+
+        A room name selects all rooms with this name. Ids are only checked, when
+        the rooms are known.
+        """
+        ids: List[str] = []
+        for room in str(rooms).split(","):
+            room = room.strip()
+            if room.isdigit():
+                if self.room_by_id and int(room) not in self.room_by_id:
+                    raise ValueError(f"Unknown room id: {room}")
+                ids.append(room)
+            elif slugify(room) in self.ids_by_name:
+                ids.extend(str(room_id) for room_id in self.ids_by_name[slugify(room)])
+            else:
+                raise ValueError(f"Unknown room: {room}")
+        return ",".join(ids)
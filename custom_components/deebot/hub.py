@@ -1,130 +1,603 @@
 """Hub module."""
 import asyncio
 import logging
+import os
 import random
 import string
-from typing import Any, List, Mapping
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Set, Tuple
 
 import aiohttp
 from aiohttp import ClientError
 from deebotozmo.ecovacs_api import EcovacsAPI
 from deebotozmo.ecovacs_mqtt import EcovacsMqtt
+from deebotozmo.events import CleanLogEvent, StatusEvent
+from deebotozmo.models import RequestAuth, Vacuum
 from deebotozmo.util import md5
-from deebotozmo.vacuum_bot import VacuumBot
 from homeassistant.const import (
     CONF_DEVICES,
     CONF_PASSWORD,
     CONF_USERNAME,
     CONF_VERIFY_SSL,
 )
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
 from homeassistant.helpers import aiohttp_client
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import STORAGE_DIR
 
-from .const import CONF_CLIENT_DEVICE_ID, CONF_CONTINENT, CONF_COUNTRY
+from .bot import TrackedVacuumBot
+from .circuit_breaker import CircuitBreaker
+from .clean_history import CleanHistory
+from .clean_stats import CleanStatsAggregator
+from .const import (
+    AUTH_TOKEN_LIFETIME,
+    AUTH_TOKEN_REFRESH_MARGIN,
+    AUTH_TOKEN_REFRESH_RETRY_DELAY,
+    CLEAN_HISTORY_DIR,
+    CONF_BUMPER,
+    CONF_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CONF_CLIENT_DEVICE_ID,
+    CONF_CONTINENT,
+    CONF_COUNTRY,
+    CONF_LIFE_SPAN_REFRESH_INTERVAL,
+    CONF_MAP_IMAGE_FORMAT,
+    CONF_MAP_STREAM_MAX_FPS,
+    CONF_MQTT_SILENCE_THRESHOLD,
+    CONF_ROOMS_REFRESH_INTERVAL,
+    CONF_STATE_WRITE_COALESCE_DELAY,
+    DATA_MQTT,
+    DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    DEFAULT_LIFE_SPAN_REFRESH_INTERVAL,
+    DEFAULT_MAP_IMAGE_FORMAT,
+    DEFAULT_MAP_STREAM_MAX_FPS,
+    DEFAULT_MQTT_SILENCE_THRESHOLD,
+    DEFAULT_ROOMS_REFRESH_INTERVAL,
+    DEFAULT_STATE_WRITE_COALESCE_DELAY,
+    DOMAIN,
+    EVENT_LIFE_SPAN,
+    EVENT_ROOMS,
+    MAP_RENDER_MAX_CONCURRENCY,
+    RECORDINGS_DIR,
+    REFRESH_AFTER_CLEANING,
+    SETUP_MAX_CONCURRENCY,
+)
+from .dispatcher import EventDispatcher, HandlerTiming
+from .mqtt import MqttConnectionManager
+from .profiler import profile_coroutine
+from .recorder import EventRecorder, async_replay, is_replaying, read_recording
+from .refresh_scheduler import RefreshScheduler
+from .storage import HubStore, StateSnapshot
+
+if TYPE_CHECKING:
+    from .entity import StateWriteCoalescer
+    from .map_image import MapImageRenderer
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def get_clean_history_path(
+    hass: HomeAssistant, entry_id: str, did: Optional[str] = None
+) -> str:
+    """Return the path of the clean history of a bot or the folder of all bots."""
+    path: str = hass.config.path(STORAGE_DIR, CLEAN_HISTORY_DIR, entry_id)
+    return path if did is None else os.path.join(path, f"{did}.jsonl")
+
+
 class DeebotHub:
     """Deebot Hub."""
 
-    def __init__(self, hass: HomeAssistant, config: Mapping[str, Any]):
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config: Mapping[str, Any],
+        entry_id: str,
+        options: Optional[Mapping[str, Any]] = None,
+    ):
         self._config: Mapping[str, Any] = config
+        options = options or {}
         self._hass: HomeAssistant = hass
+        self._store: HubStore = HubStore(hass, entry_id)
+        self._entry_id = entry_id
+        self.snapshot: StateSnapshot = StateSnapshot(hass, entry_id)
+        self._cancel_auth_refresh: Optional[CALLBACK_TYPE] = None
         self._country: str = config.get(CONF_COUNTRY, "it").lower()
         self._continent: str = config.get(CONF_CONTINENT, "eu").lower()
-        self.vacuum_bots: List[VacuumBot] = []
-        self._verify_ssl = config.get(CONF_VERIFY_SSL, True)
+        self.vacuum_bots: List[TrackedVacuumBot] = []
+        self._bots_by_did: Dict[str, TrackedVacuumBot] = {}
+        self.clean_histories: Dict[str, CleanHistory] = {}
+        self.clean_stats: CleanStatsAggregator = CleanStatsAggregator(hass, entry_id)
+        # Last known availability per did
+        self._availability: Dict[str, bool] = {}
+        # Silent bots, which were asked for their status without an answer yet
+        self._probed: Set[str] = set()
+        self._bumper: bool = config.get(CONF_USERNAME) == CONF_BUMPER
+        self._silence_threshold: float = options.get(
+            CONF_MQTT_SILENCE_THRESHOLD, DEFAULT_MQTT_SILENCE_THRESHOLD
+        )
+        self.dispatcher: EventDispatcher = EventDispatcher(hass)
+        self.circuit_breaker: CircuitBreaker = CircuitBreaker(
+            "Ecovacs cloud",
+            options.get(
+                CONF_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                DEFAULT_CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            ),
+        )
+        self.refresh_scheduler = RefreshScheduler(
+            hass,
+            self.dispatcher,
+            {
+                EVENT_LIFE_SPAN: options.get(
+                    CONF_LIFE_SPAN_REFRESH_INTERVAL, DEFAULT_LIFE_SPAN_REFRESH_INTERVAL
+                )
+                * 60,
+                EVENT_ROOMS: options.get(
+                    CONF_ROOMS_REFRESH_INTERVAL, DEFAULT_ROOMS_REFRESH_INTERVAL
+                )
+                * 60,
+            },
+            REFRESH_AFTER_CLEANING,
+        )
+        self._status_task: Optional["asyncio.Task[None]"] = None
+        self._connect_task: Optional["asyncio.Task[None]"] = None
+        self._replay_lock = asyncio.Lock()
+        # State write counters of the entities by entity id
+        self.state_writers: Dict[str, "StateWriteCoalescer"] = {}
+        self.state_write_delay: float = options.get(
+            CONF_STATE_WRITE_COALESCE_DELAY, DEFAULT_STATE_WRITE_COALESCE_DELAY
+        )
+        self._setup_concurrency: int = SETUP_MAX_CONCURRENCY
+        # Limits the map images, which are rendered in the executor at the same time
+        self.map_render_semaphore = asyncio.Semaphore(MAP_RENDER_MAX_CONCURRENCY)
+        self.map_image_format: str = options.get(
+            CONF_MAP_IMAGE_FORMAT, DEFAULT_MAP_IMAGE_FORMAT
+        )
+        self.map_stream_max_fps: float = options.get(
+            CONF_MAP_STREAM_MAX_FPS, DEFAULT_MAP_STREAM_MAX_FPS
+        )
+        # Map renderers of the live map cameras by bot did
+        self.map_renderers: Dict[str, "MapImageRenderer"] = {}
+        self._verify_ssl: bool = config.get(CONF_VERIFY_SSL, True)
         self._session: aiohttp.ClientSession = aiohttp_client.async_get_clientsession(
             self._hass, verify_ssl=self._verify_ssl
         )
 
-        device_id = config.get(CONF_CLIENT_DEVICE_ID)
+        self._mqtt_manager: MqttConnectionManager = hass.data.setdefault(
+            DOMAIN, {}
+        ).setdefault(DATA_MQTT, MqttConnectionManager())
+        self._mqtt: Optional[EcovacsMqtt] = None
+        self._ecovacs_api: EcovacsAPI
 
+    async def _async_create_api(self) -> None:
+        await self._store.async_load()
+
+        device_id = self._config.get(CONF_CLIENT_DEVICE_ID) or self._store.device_id
         if not device_id:
-            # Generate a random device ID on each bootup
+            # Generate a random device ID once and keep it across restarts
             device_id = "".join(
                 random.choice(string.ascii_uppercase + string.digits) for _ in range(12)
             )
 
-        self._mqtt: EcovacsMqtt = EcovacsMqtt(
-            continent=self._continent, country=self._country
-        )
+        if self._store.device_id != device_id:
+            self._store.device_id = device_id
+            await self._store.async_save()
 
         self._ecovacs_api = EcovacsAPI(
             self._session,
             device_id,
-            config.get(CONF_USERNAME, ""),
-            md5(config.get(CONF_PASSWORD, "")),
+            self._config.get(CONF_USERNAME, ""),
+            md5(self._config.get(CONF_PASSWORD, "")),
             continent=self._continent,
             country=self._country,
             verify_ssl=self._verify_ssl,
         )
 
-    async def async_setup(self) -> None:
-        """Init hub."""
+    async def _async_login(self) -> RequestAuth:
+        """Login and store the received token."""
+        await self._ecovacs_api.login()
+        auth = await self._ecovacs_api.get_request_auth()
+        self._store.set_auth(auth, time.time() + AUTH_TOKEN_LIFETIME)
+        await self._store.async_save()
+        return auth
+
+    async def _async_get_auth(self) -> Tuple[RequestAuth, bool]:
+        """Return auth and if it was restored from the store."""
+        auth = self._store.get_auth()
+        if auth is None:
+            return await self._async_login(), False
+
+        if not self._apply_auth(auth):
+            return await self._async_login(), False
+
+        _LOGGER.debug("Reusing stored auth token")
+        return auth, True
+
+    def _apply_auth(self, auth: RequestAuth) -> bool:
+        """Hand the auth to the API, the created bots and the MQTT connection.
+
+        deebotozmo 3.0.1 has no public API to reuse a token or to replace the
+        token of a bot or a MQTT connection, therefore its private attributes
+        are set here and only here. Returns False, if they do not exist and
+        nothing was changed.
+        """
+        if (
+            not hasattr(self._ecovacs_api, "_login_information")
+            or not all(hasattr(vacbot.json, "_auth") for vacbot in self.vacuum_bots)
+            or (self._mqtt is not None and not hasattr(self._mqtt, "_client"))
+        ):
+            _LOGGER.warning(
+                "The installed deebotozmo version does not allow to reuse tokens, "
+                "logging in again instead"
+            )
+            return False
+
+        # pylint: disable=protected-access
+        self._ecovacs_api._login_information = EcovacsAPI.LoginInformation(
+            auth.token, auth.user_id
+        )
+        for vacbot in self.vacuum_bots:
+            vacbot.json._auth = auth
+        if self._mqtt is not None and self._mqtt._client is not None:
+            # The connected client keeps its credentials for the reconnects.
+            # Initializing it again would not close the old connection in
+            # deebotozmo 3.0.1 and drop the subscriptions of the other entries.
+            self._mqtt._client.set_auth_credentials(auth.user_id, auth.token)
+        return True
+
+    @callback
+    def _async_reload_with_new_login(self) -> None:
+        """Reload the config entry, which logs in again and creates new bots."""
+        self._store.clear_auth()
+
+        async def reload() -> None:
+            await self._store.async_save()
+            await self._hass.config_entries.async_reload(self._entry_id)
+
+        self._hass.async_create_task(reload())
+
+    @callback
+    def _schedule_auth_refresh(self, delay: Optional[float] = None) -> None:
+        if delay is None:
+            expires = self._store.auth_expires or time.time()
+            delay = max(0.0, expires - AUTH_TOKEN_REFRESH_MARGIN - time.time())
+
+        self._cancel_auth_refresh = async_call_later(
+            self._hass, delay, self._async_refresh_auth
+        )
+
+    async def _async_refresh_auth(self, _: datetime) -> None:
+        self._cancel_auth_refresh = None
         try:
-            if self._mqtt:
-                self.disconnect()
+            auth = await self._async_login()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.warning("Could not refresh auth token", exc_info=True)
+            self._schedule_auth_refresh(AUTH_TOKEN_REFRESH_RETRY_DELAY)
+            return
 
-            await self._ecovacs_api.login()
-            auth = await self._ecovacs_api.get_request_auth()
+        if not self._apply_auth(auth):
+            self._async_reload_with_new_login()
+            return
 
-            await self._mqtt.initialize(auth)
+        _LOGGER.debug("Auth token refreshed")
+        self._schedule_auth_refresh()
 
-            devices = await self._ecovacs_api.get_devices()
+    async def async_setup(self, background: bool = False) -> None:
+        """Init hub.
 
-            # CREATE VACBOT FOR EACH DEVICE
-            for device in devices:
-                if device["name"] in self._config.get(CONF_DEVICES, []):
-                    vacbot = VacuumBot(
-                        self._session,
-                        auth,
-                        device,
-                        continent=self._continent,
-                        country=self._country,
-                        verify_ssl=self._verify_ssl,
-                    )
+        :param background: Create the bots from the stored devices and connect
+            to the cloud in the background, if a valid token is stored
+        """
+        try:
+            if self._mqtt:
+                self.disconnect()
 
-                    await self._mqtt.subscribe(vacbot)
-                    _LOGGER.debug("New vacbot found: %s", device["name"])
-                    self.vacuum_bots.append(vacbot)
+            await self._async_create_api()
+            await self.snapshot.async_load()
+            await self.clean_stats.async_load()
 
-            asyncio.create_task(self._check_status_task())
+            auth = self._store.get_auth()
+            devices = self._store.devices
+            if background and auth is not None and devices:
+                self._create_bots(auth, devices)
+                self._connect_task = asyncio.create_task(
+                    self._async_connect_in_background()
+                )
+                _LOGGER.debug("Hub setup complete, connecting in the background")
+                return
+
+            await self._async_connect()
 
             _LOGGER.debug("Hub setup complete")
         except Exception as ex:
             msg = "Error during setup"
             _LOGGER.error(msg, exc_info=True)
+            self.disconnect()
             raise ConfigEntryNotReady(msg) from ex
 
+    async def _async_connect(self) -> None:
+        """Connect to the cloud and subscribe the bots over MQTT."""
+        auth, restored = await self._async_get_auth()
+
+        try:
+            devices = await self._ecovacs_api.get_devices()
+        except (RuntimeError, ClientError):
+            if not restored:
+                raise
+            _LOGGER.debug("Stored auth token was rejected, login again")
+            self._store.clear_auth()
+            auth = await self._async_login()
+            devices = await self._ecovacs_api.get_devices()
+
+        self._store.devices = devices
+        await self._store.async_save()
+
+        if not self.vacuum_bots:
+            self._create_bots(auth, devices)
+        elif not self._apply_auth(auth):
+            # the bots were created from the stored devices with the outdated token
+            self._async_reload_with_new_login()
+            return
+
+        mqtt = await self._mqtt_manager.async_acquire(
+            auth, continent=self._continent, country=self._country
+        )
+        self._mqtt = mqtt
+
+        semaphore = asyncio.Semaphore(self._setup_concurrency)
+
+        async def subscribe(vacbot: TrackedVacuumBot) -> None:
+            async with semaphore:
+                await self._mqtt_manager.async_subscribe(mqtt, vacbot)
+
+        await asyncio.gather(*[subscribe(vacbot) for vacbot in self.vacuum_bots])
+
+        self._status_task = asyncio.create_task(self._check_status_task())
+        self._schedule_auth_refresh()
+        self.refresh_scheduler.async_start()
+
+    async def _async_connect_in_background(self) -> None:
+        while True:
+            try:
+                await self._async_connect()
+                self.circuit_breaker.record_success()
+                _LOGGER.debug("Connected to the cloud")
+                return
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.warning("Could not connect to the cloud", exc_info=True)
+                self._release_mqtt()
+                self.circuit_breaker.record_failure()
+                await asyncio.sleep(self.circuit_breaker.delay)
+
+    def _create_bots(self, auth: RequestAuth, devices: List[Vacuum]) -> None:
+        # CREATE VACBOT FOR EACH DEVICE
+        for device in devices:
+            if device["name"] in self._config.get(CONF_DEVICES, []):
+                vacbot = TrackedVacuumBot(
+                    self._session,
+                    auth,
+                    device,
+                    continent=self._continent,
+                    country=self._country,
+                    verify_ssl=self._verify_ssl,
+                )
+                _LOGGER.debug("New vacbot found: %s", device["name"])
+                self._add_bot(vacbot)
+
+    def _add_bot(self, vacbot: TrackedVacuumBot) -> None:
+        did = vacbot.vacuum.did
+        self.vacuum_bots.append(vacbot)
+        self._bots_by_did[did] = vacbot
+        self._availability[did] = vacbot.vacuum.status == 1
+        self.snapshot.restore(self.dispatcher, vacbot)
+
+        async def on_status(event: StatusEvent) -> None:
+            if not is_replaying():
+                self._availability[did] = event.available
+
+        self.dispatcher.subscribe(vacbot, "status", on_status)
+        self.refresh_scheduler.add_bot(vacbot)
+
+        history = CleanHistory(
+            self._hass, get_clean_history_path(self._hass, self._entry_id, did)
+        )
+        self.clean_histories[did] = history
+
+        async def on_clean_logs(event: CleanLogEvent) -> None:
+            if is_replaying():
+                # replayed cleans are not added to the history and statistics
+                return
+
+            new_entries = await history.async_add(event.logs)
+            if new_entries:
+                _LOGGER.debug(
+                    "Added %d cleans to the history of %s", len(new_entries), did
+                )
+
+            # also adds the cleans, which were stored before the statistics existed
+            last = self.clean_stats.last_timestamp(did)
+            self.clean_stats.add(
+                did, await history.async_query(None if last is None else last + 1)
+            )
+
+        self.dispatcher.subscribe(vacbot, "clean_logs", on_clean_logs)
+
+    def get_vacuum_bot(self, did: str) -> Optional[TrackedVacuumBot]:
+        """Return the bot with the given device id."""
+        return self._bots_by_did.get(did)
+
+    def get_last_clean_image_url(self, did: str) -> Optional[str]:
+        """Return the cloud url of the image of the last clean of the given bot."""
+        event: Optional[CleanLogEvent] = self.dispatcher.last_events(did).get(
+            "clean_logs"
+        )
+        if event is None or not event.logs:
+            return None
+        return event.logs[0].image_url
+
+    async def async_start_recording(self, did: str) -> str:
+        """Record all messages of the given bot and return the file path."""
+        vacbot = self._bots_by_did[did]
+        if vacbot.recorder is not None:
+            return vacbot.recorder.path
+
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        recorder = EventRecorder(
+            self._hass,
+            self._hass.config.path(RECORDINGS_DIR, f"{did}-{timestamp}.jsonl"),
+        )
+        await recorder.async_start()
+        vacbot.recorder = recorder
+        return recorder.path
+
+    async def async_stop_recording(self, did: str) -> None:
+        """Stop recording the messages of the given bot."""
+        vacbot = self._bots_by_did[did]
+        recorder = vacbot.recorder
+        if recorder is not None:
+            vacbot.recorder = None
+            await recorder.async_stop()
+
+    async def async_replay(
+        self, did: str, name: str, speed: float
+    ) -> Tuple[int, float, Dict[str, HandlerTiming]]:
+        """Replay the recording with the given name into the bot.
+
+        The name is relative to the recordings folder, files outside of it are
+        rejected.
+
+        The live events are passed to the entities again after the replay to
+        restore their state.
+
+        Returns the number of replayed messages, the duration and the timings of
+        the event handlers.
+        """
+        try:
+            messages = await self._hass.async_add_executor_job(
+                read_recording, self._hass.config.path(RECORDINGS_DIR), name
+            )
+        except ValueError as ex:
+            raise HomeAssistantError(str(ex)) from ex
+        vacbot = self._bots_by_did[did]
+
+        async with self._replay_lock:
+            live_events = self.dispatcher.last_events(did)
+            timings: Dict[str, HandlerTiming] = {}
+            self.dispatcher.handler_timings = timings
+            try:
+                duration = await async_replay(vacbot, messages, speed)
+                # the emitters notify their listeners in new tasks,
+                # let the ones of the last messages finish
+                for _ in range(2):
+                    await asyncio.sleep(0)
+            finally:
+                self.dispatcher.handler_timings = None
+                for event_name, event in live_events.items():
+                    getattr(vacbot.events, event_name).notify(event)
+            return len(messages), duration, timings
+
+    async def async_save_snapshot(self) -> None:
+        """Save the last known state of the bots."""
+        await self.snapshot.async_save(self.dispatcher, self.vacuum_bots)
+
+    def _release_mqtt(self) -> None:
+        if self._mqtt is not None:
+            for vacbot in self.vacuum_bots:
+                self._mqtt_manager.unsubscribe(self._mqtt, vacbot)
+            self._mqtt_manager.release(self._mqtt)
+            self._mqtt = None
+
     def disconnect(self) -> None:
         """Disconnect hub."""
-        self._mqtt.disconnect()
+        if self._connect_task is not None:
+            self._connect_task.cancel()
+            self._connect_task = None
+        if self._cancel_auth_refresh is not None:
+            self._cancel_auth_refresh()
+            self._cancel_auth_refresh = None
+        if self._status_task is not None:
+            self._status_task.cancel()
+            self._status_task = None
+        self.refresh_scheduler.stop()
+        for vacbot in self._bots_by_did.values():
+            vacbot.command_queue.cancel()
+            if vacbot.recorder is not None:
+                self._hass.async_create_task(vacbot.recorder.async_stop())
+                vacbot.recorder = None
+        self.dispatcher.unsubscribe_all()
+        self._release_mqtt()
+        self.vacuum_bots.clear()
+        self._bots_by_did.clear()
+        self.clean_histories.clear()
+        self._availability.clear()
+        self._probed.clear()
 
     @property
     def name(self) -> str:
         """Return the name of the hub."""
         return "Deebot Hub"
 
+    @property
+    def verify_ssl(self) -> bool:
+        """Return True, if the certificates of the cloud are verified."""
+        return self._verify_ssl
+
     async def _check_status_task(self) -> None:
         while True:
+            await asyncio.sleep(self.circuit_breaker.delay)
             try:
-                await asyncio.sleep(60)
-                await self._check_status_function()
-            except ClientError as ex:
-                _LOGGER.warning(
+                await profile_coroutine(self._hass, self._check_status_function())
+            except (ClientError, asyncio.TimeoutError) as ex:
+                _LOGGER.debug(
                     "A client error occurred, probably the ecovacs servers are unstable: %s",
                     ex,
                 )
+                self.circuit_breaker.record_failure()
             except Exception as ex:  # pylint: disable=broad-except
                 _LOGGER.error(ex, exc_info=True)
+                self.circuit_breaker.record_failure()
 
     async def _check_status_function(self) -> None:
+        """Update the availability of the bots.
+
+        The cloud is only asked for the bots not heard from recently and only if
+        the circuit breaker allows it. Otherwise the breaker stays untouched, as a
+        half open breaker must be closed or reopened by the probe call.
+        """
+        silent: Dict[str, TrackedVacuumBot] = {}
+        for did, bot in self._bots_by_did.items():
+            if bot.seen_within(self._silence_threshold):
+                self._probed.discard(did)
+                self._set_available(did, True)
+            else:
+                silent[did] = bot
+
+        if not silent:
+            # All bots were heard from recently, no need to ask the cloud
+            return
+
+        if self._bumper:
+            # Bumper provides no device status, therefore the silent bots are
+            # asked directly and marked unavailable if they don't answer
+            for did, bot in silent.items():
+                if did in self._probed:
+                    self._set_available(did, False)
+                else:
+                    self._probed.add(did)
+                bot.events.status.request_refresh()
+            return
+
+        if not self.circuit_breaker.allow_request():
+            return
+
         devices = await self._ecovacs_api.get_devices()
         for device in devices:
-            bot: VacuumBot
-            for bot in self.vacuum_bots:
-                if device.did == bot.vacuum.did:
-                    bot.set_available(device.status == 1)
+            if device.did in silent:
+                self._set_available(device.did, device.status == 1)
+        self.circuit_breaker.record_success()
+
+    def _set_available(self, did: str, available: bool) -> None:
+        if self._availability.get(did) != available:
+            # only transitions are propagated
+            self._availability[did] = available
+            self._bots_by_did[did].set_available(available)
@@ -0,0 +1,384 @@
+"""Map image module."""
+import asyncio
+import base64
+import copy
+import logging
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from deebotozmo.map import Map
+from homeassistant.core import HomeAssistant
+from PIL import Image
+
+from .const import (
+    DEFAULT_MAP_IMAGE_FORMAT,
+    DEFAULT_MAP_STREAM_MAX_FPS,
+    MAP_CACHE_MAX_BYTES,
+    MAP_CACHE_MAX_ENTRIES,
+    MAP_STREAM_IMAGE_FORMAT,
+)
+from .profiler import async_add_profiled_executor_job
+
+_LOGGER = logging.getLogger(__name__)
+
+# (map version, width, height, image format)
+MapImageKey = Tuple[int, Optional[int], Optional[int], str]
+
+IMAGE_FORMAT_TO_CONTENT_TYPE = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+# Used for formats without transparency
+_BACKGROUND_COLOR = (255, 255, 255)
+
+
+class MapImageCache:
+    """LRU cache for rendered map images, bounded by entries and memory."""
+
+    def __init__(
+        self,
+        max_entries: int = MAP_CACHE_MAX_ENTRIES,
+        max_bytes: int = MAP_CACHE_MAX_BYTES,
+    ):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._images: "OrderedDict[MapImageKey, bytes]" = OrderedDict()
+        self._size: int = 0
+        self.version: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @property
+    def size(self) -> int:
+        """Return the memory used by the cached images in bytes."""
+        return self._size
+
+    def as_dict(self) -> Dict[str, int]:
+        """Return the metrics of the cache as dict."""
+        return {
+            "entries": len(self._images),
+            "size_bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def invalidate(self) -> None:
+        """Start a new map version and drop all images of the previous ones."""
+        self.version += 1
+        self._images.clear()
+        self._size = 0
+
+    def get(self, key: MapImageKey) -> Optional[bytes]:
+        """Return cached image or None."""
+        image = self._images.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._images.move_to_end(key)
+        return image
+
+    def put(self, key: MapImageKey, image: bytes) -> None:
+        """Add the rendered image for the given key."""
+        if key[0] != self.version:
+            _LOGGER.debug("Discarding image of outdated map version %d", key[0])
+            return
+
+        if len(image) > self._max_bytes:
+            return
+
+        old = self._images.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+
+        self._images[key] = image
+        self._size += len(image)
+
+        while len(self._images) > self._max_entries or self._size > self._max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self._size -= len(evicted)
+
+
+class _MapInternals:
+    """Access to the internals of the deebotozmo map.
+
+    The map of deebotozmo 3.0.1 (see manifest.json) offers no public API to
+    detect changes without a MapEvent or to copy it. This is the only place,
+    which uses its private attributes. If they are missing in another version,
+    the public API is used instead: the images are invalidated only on map events
+    and the live map is rendered.
+    """
+
+    _ATTRIBUTES = ("_map_pieces", "_trace_values", "_is_map_up_to_date")
+
+    def __init__(self, vacuum_map: Map):
+        self._map = vacuum_map
+        self.supported = all(hasattr(vacuum_map, attr) for attr in self._ATTRIBUTES)
+        if not self.supported:
+            _LOGGER.warning(
+                "Unsupported deebotozmo map, map changes are only detected on map events"
+            )
+
+    def has_map_data(self) -> bool:
+        """Return True, if the bot has sent map pieces."""
+        # pylint: disable=protected-access
+        return self.supported and any(piece.in_use for piece in self._map._map_pieces)
+
+    def pop_changed(self) -> bool:
+        """Return True, if the map changed since the last call."""
+        # pylint: disable=protected-access
+        if not self.supported or self._map._is_map_up_to_date:
+            return False
+        self._map._is_map_up_to_date = True
+        return True
+
+    def snapshot(self) -> Map:
+        """Return a copy of the map, which can be rendered outside of the event loop.
+
+        The event loop keeps updating the original map while the copy is rendered.
+        """
+        if not self.supported:
+            return self._map
+
+        # pylint: disable=protected-access
+        snapshot = copy.copy(self._map)
+        snapshot._map_pieces = [copy.copy(piece) for piece in self._map._map_pieces]
+        snapshot._trace_values = list(self._map._trace_values)
+        snapshot._is_map_up_to_date = False
+        return snapshot
+
+
+def _render(vacuum_map: Map) -> bytes:
+    return base64.decodebytes(vacuum_map.get_base64_map())
+
+
+def _resize(
+    png: bytes, width: Optional[int], height: Optional[int], image_format: str
+) -> bytes:
+    """Fit the image into the given box, keep the aspect ratio and encode it."""
+    image = Image.open(BytesIO(png))
+    scale = min(
+        width / image.width if width else float("inf"),
+        height / image.height if height else float("inf"),
+    )
+    if scale != float("inf"):
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        if size != image.size:
+            # keep the map pixels sharp on upscaling
+            image = image.resize(size, Image.NEAREST if scale > 1 else Image.LANCZOS)
+
+    if image_format == "jpeg" and image.mode != "RGB":
+        background = Image.new("RGB", image.size, _BACKGROUND_COLOR)
+        background.paste(image, mask=image.convert("RGBA"))
+        image = background
+
+    buffered = BytesIO()
+    image.save(buffered, format=image_format.upper())
+    return buffered.getvalue()
+
+
+class MapImageRenderer:
+    """Render map images in the executor and cache them.
+
+    The full size map is rendered once per map version and all resized variants
+    are derived from it. Concurrent requests for the same image share one render.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        vacuum_map: Map,
+        semaphore: asyncio.Semaphore,
+        image_format: str = DEFAULT_MAP_IMAGE_FORMAT,
+    ):
+        self._hass = hass
+        self._map = _MapInternals(vacuum_map)
+        self._semaphore = semaphore
+        self._image_format = image_format
+        self._cache = MapImageCache()
+        self._in_flight: Dict[MapImageKey, "asyncio.Future[bytes]"] = {}
+        self.render_count: int = 0
+        self.last_render_duration: Optional[float] = None
+        self.total_render_duration: float = 0.0
+        # full size png of the last render or the restored one
+        self.last_image: Optional[bytes] = None
+        self._restored: bool = False
+
+    @property
+    def content_type(self) -> str:
+        """Return the content type of the images."""
+        return IMAGE_FORMAT_TO_CONTENT_TYPE[self._image_format]
+
+    @property
+    def version(self) -> int:
+        """Return the current map version."""
+        return self._cache.version
+
+    def invalidate(self) -> None:
+        """Invalidate all cached images."""
+        self._restored = False
+        self._cache.invalidate()
+
+    def restore(self, image: bytes) -> None:
+        """Serve the given full size png until the bot has sent map data."""
+        self._cache.put((self._cache.version, None, None, "png"), image)
+        self.last_image = image
+        self._restored = True
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the metrics of the renderer and its cache as dict."""
+        return {
+            "renders": self.render_count,
+            "last_render_duration_ms": None
+            if self.last_render_duration is None
+            else round(self.last_render_duration * 1000, 3),
+            "total_render_duration_ms": round(self.total_render_duration * 1000, 3),
+            "cache": self._cache.as_dict(),
+        }
+
+    def check_for_changes(self) -> None:
+        """Invalidate the cached images, if the map was changed."""
+        if self._restored:
+            if not self._map.has_map_data():
+                return
+            self._restored = False
+
+        # deebotozmo does not emit a MapEvent for every map change,
+        # therefore check also the map's own change flag
+        if self._map.pop_changed():
+            self._cache.invalidate()
+
+    async def async_get_image(
+        self,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        image_format: Optional[str] = None,
+    ) -> bytes:
+        """Return the map image from the cache or render it.
+
+        The image is encoded in the configured format, if no format is given.
+        """
+        self.check_for_changes()
+        return await self._async_get(
+            (
+                self._cache.version,
+                width or None,
+                height or None,
+                image_format or self._image_format,
+            )
+        )
+
+    async def _async_get(self, key: MapImageKey) -> bytes:
+        image = self._cache.get(key)
+        if image is not None:
+            return image
+
+        future = self._in_flight.get(key)
+        if future is None:
+            if key[1:] == (None, None, "png"):
+                future = self._hass.async_create_task(
+                    self._async_render(key, self._map.snapshot())
+                )
+            else:
+                future = self._hass.async_create_task(self._async_render_variant(key))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        return await asyncio.shield(future)
+
+    async def _async_render(self, key: MapImageKey, vacuum_map: Map) -> bytes:
+        async with self._semaphore:
+            start = time.perf_counter()
+            image = await async_add_profiled_executor_job(
+                self._hass, _render, vacuum_map
+            )
+            duration = time.perf_counter() - start
+
+        self.render_count += 1
+        self.last_render_duration = duration
+        self.total_render_duration += duration
+        _LOGGER.debug("Rendered map %s in %.3fs", key, duration)
+
+        self.last_image = image
+        self._cache.put(key, image)
+        return image
+
+    async def _async_render_variant(self, key: MapImageKey) -> bytes:
+        base = await self._async_get((key[0], None, None, "png"))
+        _, width, height, image_format = key
+        async with self._semaphore:
+            image = await async_add_profiled_executor_job(
+                self._hass, _resize, base, width, height, image_format
+            )
+
+        _LOGGER.debug("Created map variant %s (%d bytes)", key, len(image))
+        self._cache.put(key, image)
+        return image
+
+
+class MapFrameStream:
+    """Push a map frame to all subscribers, whenever the map changes.
+
+    Each frame is rendered once as jpeg and shared with all subscribers.
+    At most max_fps frames per second are produced.
+    """
+
+    content_type = IMAGE_FORMAT_TO_CONTENT_TYPE[MAP_STREAM_IMAGE_FORMAT]
+
+    def __init__(
+        self, renderer: MapImageRenderer, max_fps: float = DEFAULT_MAP_STREAM_MAX_FPS
+    ):
+        self._renderer = renderer
+        self._interval = 1 / max_fps
+        self._subscribers: List["asyncio.Queue[bytes]"] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._frame: Optional[bytes] = None
+        self._frame_version: Optional[int] = None
+
+    async def frames(self) -> AsyncGenerator[bytes, None]:
+        """Yield the current frame and afterwards every new one."""
+        queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=1)
+        if self._frame is not None:
+            queue.put_nowait(self._frame)
+
+        self._subscribers.append(queue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._async_produce())
+
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.remove(queue)
+            if not self._subscribers and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    async def _async_produce(self) -> None:
+        while True:
+            self._renderer.check_for_changes()
+            version = self._renderer.version
+            if version != self._frame_version:
+                try:
+                    frame = await self._renderer.async_get_image(
+                        image_format=MAP_STREAM_IMAGE_FORMAT
+                    )
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.warning("Could not render map frame", exc_info=True)
+                else:
+                    self._frame = frame
+                    self._frame_version = version
+                    self._publish(frame)
+
+            await asyncio.sleep(self._interval)
+
+    def _publish(self, frame: bytes) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                # slow subscriber, replace the outdated frame
+                queue.get_nowait()
+            queue.put_nowait(frame)
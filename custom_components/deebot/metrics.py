@@ -0,0 +1,88 @@
+"""Metrics module."""
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+
+def _format_bound(bound: float) -> str:
+    return f"{bound * 1000:g}ms"
+
+
+class LatencyHistogram:
+    """Histogram with fixed buckets, which is cheap enough to be updated per call."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        # the last bucket holds the calls slower than the last bound
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def add(self, duration: float) -> None:
+        """Add the duration of a call in seconds."""
+        self.counts[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add all calls of the other histogram."""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Return the upper bound of the bucket containing the given percentile."""
+        if not self.count:
+            return None
+
+        threshold = self.count * percent / 100
+        cumulative = 0
+        for index, count in enumerate(self.counts[:-1]):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(LATENCY_BUCKETS[index], self.max)
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the histogram in milliseconds as dict."""
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        buckets = {
+            f"<={_format_bound(bound)}": count
+            for bound, count in zip(LATENCY_BUCKETS, self.counts)
+        }
+        buckets[f">{_format_bound(LATENCY_BUCKETS[-1])}"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else None,
+            "p50_ms": None if p50 is None else round(p50 * 1000, 3),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "buckets": buckets,
+        }
+
+
+class EventMetrics:
+    """Metrics of one event type of a bot."""
+
+    __slots__ = ("events", "last_received", "latency")
+
+    def __init__(self) -> None:
+        # number of events received
+        self.events: int = 0
+        # monotonic timestamp of the last event
+        self.last_received: Optional[float] = None
+        # duration of each subscriber callback call
+        self.latency: LatencyHistogram = LatencyHistogram()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the metrics as dict."""
+        return {"events": self.events, "handler_latency": self.latency.as_dict()}
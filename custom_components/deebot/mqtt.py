@@ -0,0 +1,115 @@
+"""MQTT connection module."""
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from deebotozmo.ecovacs_mqtt import EcovacsMqtt
+from deebotozmo.models import RequestAuth
+from deebotozmo.vacuum_bot import VacuumBot
+
+_LOGGER = logging.getLogger(__name__)
+
+# (broker, user id)
+_ConnectionKey = Tuple[str, str]
+
+
+def _get_broker(continent: str, country: str) -> str:
+    # Must be kept in sync with EcovacsMqtt
+    if country.lower() == "cn":
+        return "mq.ecouser.net"
+    return f"mq-{continent.lower()}.ecouser.net"
+
+
+class MqttConnectionManager:
+    """Share MQTT connections between config entries.
+
+    Entries connecting to the same broker with the same user share one
+    connection, which is closed when the last entry releases it. A connection
+    passes the messages of a bot to only one subscriber, therefore a bot can be
+    subscribed by only one entry.
+    """
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+        self._connections: Dict[_ConnectionKey, EcovacsMqtt] = {}
+        self._ref_counts: Dict[_ConnectionKey, int] = {}
+        # subscribed bots by did per connection
+        self._subscribers: Dict[_ConnectionKey, Dict[str, VacuumBot]] = {}
+
+    def _get_key(self, mqtt: EcovacsMqtt) -> Optional[_ConnectionKey]:
+        for key, connection in self._connections.items():
+            if connection is mqtt:
+                return key
+        return None
+
+    async def async_acquire(
+        self, auth: RequestAuth, *, continent: str, country: str
+    ) -> EcovacsMqtt:
+        """Return a connected client for the given broker and user."""
+        key = (_get_broker(continent, country), auth.user_id)
+        async with self._lock:
+            mqtt = self._connections.get(key)
+            if mqtt is None:
+                mqtt = EcovacsMqtt(continent=continent, country=country)
+                await mqtt.initialize(auth)
+                self._connections[key] = mqtt
+                self._ref_counts[key] = 0
+                self._subscribers[key] = {}
+                _LOGGER.debug("Opened MQTT connection to %s", key[0])
+
+            self._ref_counts[key] += 1
+            return mqtt
+
+    async def async_subscribe(self, mqtt: EcovacsMqtt, vacuum_bot: VacuumBot) -> bool:
+        """Subscribe the bot on the given client.
+
+        Returns False, if another bot with the same did is subscribed already.
+        """
+        key = self._get_key(mqtt)
+        if key is None:
+            raise RuntimeError("MQTT connection was released")
+
+        subscribers = self._subscribers[key]
+        did = vacuum_bot.vacuum.did
+        subscriber = subscribers.get(did)
+        if subscriber is not None and subscriber is not vacuum_bot:
+            _LOGGER.warning(
+                "Bot %s is already subscribed by another config entry, "
+                "its messages are only passed to that entry",
+                did,
+            )
+            return False
+
+        subscribers[did] = vacuum_bot
+        try:
+            await mqtt.subscribe(vacuum_bot)
+        except Exception:
+            del subscribers[did]
+            raise
+        return True
+
+    def unsubscribe(self, mqtt: EcovacsMqtt, vacuum_bot: VacuumBot) -> None:
+        """Unsubscribe the bot, if it was subscribed on the given client by it."""
+        key = self._get_key(mqtt)
+        if key is None:
+            return
+
+        subscribers = self._subscribers[key]
+        did = vacuum_bot.vacuum.did
+        if subscribers.get(did) is vacuum_bot:
+            del subscribers[did]
+            mqtt.unsubscribe(vacuum_bot)
+
+    def release(self, mqtt: EcovacsMqtt) -> None:
+        """Release the given client and disconnect it, if it is not used anymore."""
+        key = self._get_key(mqtt)
+        if key is None:
+            return
+
+        self._ref_counts[key] -= 1
+        if self._ref_counts[key] <= 0:
+            del self._connections[key]
+            del self._ref_counts[key]
+            del self._subscribers[key]
+            mqtt.disconnect()
+            _LOGGER.debug("Closed MQTT connection to %s", key[0])
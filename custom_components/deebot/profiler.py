@@ -0,0 +1,194 @@
+"""Profiler for the code of the integration."""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Generator, List, Optional, TypeVar
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DATA_PROFILER, DOMAIN, PROFILES_DIR
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# Only functions of files matching this pattern are kept in the profile
+_PROFILED_FILES = re.compile(
+    r"[\\/](custom_components[\\/]deebot|deebotozmo)[\\/]", re.IGNORECASE
+)
+
+
+class _ProfilerSession:
+    """Profile of the coroutines and the executor jobs of the integration."""
+
+    def __init__(self) -> None:
+        self.loop_profile = cProfile.Profile()
+        self.active = True
+        # nesting depth of the profiled coroutine steps on the loop thread
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._job_profiles: List[cProfile.Profile] = []
+
+    def enter(self) -> None:
+        """Enable the loop profile, when the outermost profiled step starts."""
+        self._depth += 1
+        if self._depth == 1 and self.active:
+            self.loop_profile.enable()
+
+    def exit(self) -> None:
+        """Disable the loop profile, when the outermost profiled step ends."""
+        self._depth -= 1
+        if self._depth == 0 and self.active:
+            self.loop_profile.disable()
+
+    def add_job_profile(self, profile: cProfile.Profile) -> None:
+        """Add the profile of an executor job."""
+        with self._lock:
+            self._job_profiles.append(profile)
+
+    def get_stats(self) -> pstats.Stats:
+        """Return the stats limited to the functions of the integration."""
+        stats = pstats.Stats(self.loop_profile)
+        with self._lock:
+            for profile in self._job_profiles:
+                stats.add(profile)
+
+        # pylint: disable=no-member
+        stats.stats = {  # type: ignore
+            func: value
+            for func, value in stats.stats.items()  # type: ignore
+            if _PROFILED_FILES.search(func[0])
+        }
+        return stats
+
+
+def _get_session(hass: HomeAssistant) -> Optional[_ProfilerSession]:
+    session: Optional[_ProfilerSession] = hass.data.get(DOMAIN, {}).get(DATA_PROFILER)
+    return session
+
+
+def is_profiling(hass: HomeAssistant) -> bool:
+    """Return True, if a profile is running."""
+    return _get_session(hass) is not None
+
+
+def _step_profiled(
+    session: _ProfilerSession, coro: Awaitable[_T]
+) -> Generator[Any, Any, _T]:
+    # Each step of the coroutine is profiled, but not the other tasks running on
+    # the loop while it is suspended
+    iterator = coro.__await__()
+    value: Any = None
+    error: Optional[BaseException] = None
+    while True:
+        session.enter()
+        try:
+            if error is None:
+                yielded = iterator.send(value)
+            else:
+                yielded = iterator.throw(error)
+        except StopIteration as ex:
+            return ex.value  # type: ignore
+        finally:
+            session.exit()
+
+        try:
+            value, error = (yield yielded), None
+        except BaseException as ex:  # pylint: disable=broad-except
+            value, error = None, ex
+
+
+class _ProfiledAwaitable(Awaitable[_T]):
+    """Awaitable, which profiles the wrapped coroutine while it runs."""
+
+    def __init__(self, session: _ProfilerSession, coro: Awaitable[_T]):
+        self._session = session
+        self._coro = coro
+
+    def __await__(self) -> Generator[Any, Any, _T]:
+        return _step_profiled(self._session, self._coro)
+
+
+def profile_coroutine(hass: HomeAssistant, coro: Awaitable[_T]) -> Awaitable[_T]:
+    """Profile the given coroutine of the integration, if a profile is running."""
+    session = _get_session(hass)
+    if session is None:
+        return coro
+    return _ProfiledAwaitable(session, coro)
+
+
+def _run_profiled(session: _ProfilerSession, func: Callable[..., _T], *args: Any) -> _T:
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args)
+    finally:
+        session.add_job_profile(profile)
+
+
+async def async_add_profiled_executor_job(
+    hass: HomeAssistant, func: Callable[..., _T], *args: Any
+) -> _T:
+    """Run the function in the executor and profile it, if a profile is running."""
+    session = _get_session(hass)
+    if session is None:
+        result: _T = await hass.async_add_executor_job(func, *args)
+    else:
+        result = await hass.async_add_executor_job(_run_profiled, session, func, *args)
+    return result
+
+
+def _write_stats(session: _ProfilerSession, path: str, top: int) -> str:
+    stats = session.get_stats()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    stats.dump_stats(path)
+
+    summary = io.StringIO()
+    stats.stream = summary  # type: ignore
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    return summary.getvalue()
+
+
+async def async_profile(hass: HomeAssistant, duration: float, top: int) -> str:
+    """Profile the integration for the given seconds and return the file path.
+
+    Only the loop steps of the coroutines wrapped with profile_coroutine (hub
+    polling and event handlers) are profiled deterministically, the rest of the
+    loop runs unprofiled. Executor jobs are included, if they are run with
+    async_add_profiled_executor_job. The stats are written in the pstats format
+    and the top functions by cumulative time are logged.
+    """
+    data = hass.data.setdefault(DOMAIN, {})
+    if DATA_PROFILER in data:
+        raise HomeAssistantError("A profile is already running")
+
+    session = _ProfilerSession()
+    try:
+        # check that no other profiler is active, before the coroutines use it
+        session.loop_profile.enable()
+        session.loop_profile.disable()
+    except ValueError as ex:
+        raise HomeAssistantError(f"Could not start profiler: {ex}") from ex
+
+    data[DATA_PROFILER] = session
+    _LOGGER.info("Profiling for %.0f seconds", duration)
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        # coroutines still running stop profiling at their next step
+        session.active = False
+        # the domain data is removed, if the last entry was unloaded meanwhile
+        hass.data.get(DOMAIN, {}).pop(DATA_PROFILER, None)
+
+    path: str = hass.config.path(
+        PROFILES_DIR, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+    )
+    summary = await hass.async_add_executor_job(_write_stats, session, path, top)
+    _LOGGER.info("Profile written to %s\n%s", path, summary)
+    return path
@@ -0,0 +1,212 @@
+"""Record and replay of the messages received from the bots."""
+import asyncio
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Union
+
+from deebotozmo.commands import COMMANDS, Command
+from deebotozmo.commands.custom import CustomCommand
+from deebotozmo.vacuum_bot import VacuumBot
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import RECORDER_FLUSH_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+# True in the replay and in all tasks started by the replayed messages
+_replaying: ContextVar[bool] = ContextVar("deebot_replaying", default=False)
+
+
+def is_replaying() -> bool:
+    """Return True, if the current code runs because of a replayed message."""
+    return _replaying.get()
+
+
+@dataclass(frozen=True)
+class RecordedMessage:
+    """Message received from a bot."""
+
+    timestamp: float
+    did: str
+    command: str
+    # True, if the message is the response to a requested command
+    requested: bool
+    args: Union[Dict[str, Any], List[Any], None]
+    message: Dict[str, Any]
+
+
+def _append(path: str, lines: List[str]) -> None:
+    with open(path, "a", encoding="utf-8") as file:
+        file.writelines(lines)
+
+
+def read_recording(directory: str, name: str) -> List[RecordedMessage]:
+    """Read the recording with the given name. Do not call it from the event loop.
+
+    :raises ValueError: if the file is not inside of the given directory, can't be
+        read or contains a line, which is no recorded message
+    """
+    directory = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(directory, name))
+    if os.path.commonpath([directory, path]) != directory:
+        raise ValueError("Only recordings in the recordings folder can be replayed")
+
+    messages = []
+    try:
+        with open(path, encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                    messages.append(
+                        RecordedMessage(
+                            data["t"],
+                            data["d"],
+                            data["c"],
+                            data["r"],
+                            data.get("a"),
+                            data["m"],
+                        )
+                    )
+                except (ValueError, KeyError, TypeError) as ex:
+                    # ex. a line, which was not completely written
+                    raise ValueError(
+                        f"Line {number} of {name} is no recorded message"
+                    ) from ex
+    except OSError as ex:
+        raise ValueError(f"Could not read {name}: {ex.strerror}") from ex
+    except UnicodeDecodeError as ex:
+        raise ValueError(f"{name} is no recording") from ex
+    return messages
+
+
+class EventRecorder:
+    """Append every message received from the bots to a file.
+
+    Each message is stored as a compact json line. The lines are buffered and
+    written in the executor every flush interval.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        path: str,
+        flush_interval: float = RECORDER_FLUSH_INTERVAL,
+    ):
+        self._hass = hass
+        self.path = path
+        self._flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._cancel_flush: Optional[CALLBACK_TYPE] = None
+        self.recorded: int = 0
+
+    async def async_start(self) -> None:
+        """Start recording."""
+        await self._hass.async_add_executor_job(
+            lambda: os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        )
+
+        async def flush(_: datetime) -> None:
+            await self.async_flush()
+
+        self._cancel_flush = async_track_time_interval(
+            self._hass, flush, timedelta(seconds=self._flush_interval)
+        )
+        _LOGGER.info("Recording bot messages to %s", self.path)
+
+    async def async_stop(self) -> None:
+        """Stop recording and write the remaining messages."""
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+            self._cancel_flush = None
+        await self.async_flush()
+        _LOGGER.info("Recorded %d bot messages to %s", self.recorded, self.path)
+
+    async def async_flush(self) -> None:
+        """Write the buffered messages to the file."""
+        if not self._buffer:
+            return
+
+        lines, self._buffer = self._buffer, []
+        await self._hass.async_add_executor_job(_append, self.path, lines)
+
+    @callback
+    def record(
+        self,
+        did: str,
+        command: Union[str, Command, CustomCommand],
+        message: Dict[str, Any],
+    ) -> None:
+        """Record the given message."""
+        data: Dict[str, Any] = {"t": round(time.time(), 3), "d": did}
+        if isinstance(command, str):
+            data.update({"c": command, "r": False})
+        else:
+            data.update({"c": command.name, "r": True, "a": command.args})
+        data["m"] = message
+
+        self._buffer.append(json.dumps(data, separators=(",", ":")) + "\n")
+        self.recorded += 1
+
+
+class _RecordedCommand:
+    """Stand-in for requested commands without own handling (ex. map commands)."""
+
+    def __init__(self, name: str, args: Any):
+        self.name = name
+        self.args = args
+
+
+def _get_command(recorded: RecordedMessage) -> Union[str, Command, _RecordedCommand]:
+    if not recorded.requested:
+        return recorded.command
+
+    command_class = COMMANDS.get(recorded.command)
+    if command_class is None:
+        return _RecordedCommand(recorded.command, recorded.args)
+
+    # the constructors differ per command, but the handling needs only the args
+    command: Command = command_class.__new__(command_class)
+    Command.__init__(command, recorded.args)
+    return command
+
+
+async def async_replay(
+    vacuum_bot: VacuumBot, messages: List[RecordedMessage], speed: float = 1.0
+) -> float:
+    """Pass the recorded messages to the given bot and return the duration.
+
+    The messages are handled with is_replaying set, therefore they are neither
+    proof of life nor trigger commands to the cloud.
+
+    :param speed: 1 replays in real time, 2 twice as fast; 0 without any delay
+    """
+    if not messages:
+        return 0.0
+
+    token = _replaying.set(True)
+    try:
+        first = messages[0].timestamp
+        start = time.monotonic()
+        for recorded in messages:
+            if speed > 0:
+                delay = (recorded.timestamp - first) / speed - (
+                    time.monotonic() - start
+                )
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            await vacuum_bot.handle(
+                _get_command(recorded), recorded.message  # type: ignore
+            )
+
+        return time.monotonic() - start
+    finally:
+        _replaying.reset(token)
@@ -0,0 +1,183 @@
+"""Background refresh scheduler module."""
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from deebotozmo.events import StatusEvent
+from deebotozmo.models import VacuumState
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from .bot import TrackedVacuumBot
+from .commands import REFRESH_PARTS, REFRESH_RESULT_FAILED, async_refresh
+from .const import (
+    REFRESH_AFTER_CLEANING_DELAY,
+    REFRESH_JITTER,
+    REFRESH_SCHEDULER_INTERVAL,
+)
+from .dispatcher import EventDispatcher
+from .recorder import is_replaying
+
+_LOGGER = logging.getLogger(__name__)
+
+# States, which end a cleaning
+_CLEANING_ENDED = (VacuumState.DOCKED, VacuumState.IDLE)
+
+
+def _next_due(since: float, ttl: float) -> float:
+    return since + ttl * random.uniform(1 - REFRESH_JITTER, 1 + REFRESH_JITTER)
+
+
+class RefreshScheduler:
+    """Refresh parts of the bots in the background.
+
+    A part with a TTL is refreshed, when no data was received for it within the
+    TTL. The refresh times are spread with jitter to not refresh all bots at once.
+    The parts refreshed after cleaning are requested, when a bot finished cleaning
+    and didn't send them by itself.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        dispatcher: EventDispatcher,
+        ttls: Mapping[str, float],
+        after_cleaning: Sequence[str],
+    ):
+        self._hass = hass
+        self._dispatcher = dispatcher
+        # seconds per part, parts without ttl are not refreshed periodically
+        self._ttls = {part: ttl for part, ttl in ttls.items() if ttl > 0}
+        self._after_cleaning = after_cleaning
+        self._bots: Dict[str, TrackedVacuumBot] = {}
+        # monotonic due time by (bot did, part)
+        self._due: Dict[Tuple[str, str], float] = {}
+        self._cleaning: Set[str] = set()
+        self._cancel_tick: Optional[CALLBACK_TYPE] = None
+        self._cancel_after_cleaning: Dict[str, CALLBACK_TYPE] = {}
+        self._unsubscribe: List[CALLBACK_TYPE] = []
+        self.refreshes: int = 0
+        # refreshes not needed as the bot sent the data recently
+        self.skipped: int = 0
+
+    def _is_fresh(self, did: str, part: str, since: float) -> bool:
+        received = self._dispatcher.last_received(did, REFRESH_PARTS[part].event_name)
+        return received is not None and received >= since
+
+    @callback
+    def add_bot(self, vacuum_bot: TrackedVacuumBot) -> None:
+        """Add a bot to be refreshed."""
+        did = vacuum_bot.vacuum.did
+        self._bots[did] = vacuum_bot
+        now = time.monotonic()
+        for part, ttl in self._ttls.items():
+            # the parts are refreshed on subscribing, spread the next refreshes
+            self._due[(did, part)] = now + random.uniform(0, ttl)
+
+        if not self._after_cleaning:
+            return
+
+        async def on_status(event: StatusEvent) -> None:
+            if is_replaying():
+                return
+            if event.state == VacuumState.CLEANING:
+                self._cleaning.add(did)
+            elif event.state in _CLEANING_ENDED and did in self._cleaning:
+                self._cleaning.discard(did)
+                self._schedule_after_cleaning(vacuum_bot)
+
+        self._unsubscribe.append(
+            self._dispatcher.subscribe(vacuum_bot, "status", on_status)
+        )
+
+    @callback
+    def _schedule_after_cleaning(self, vacuum_bot: TrackedVacuumBot) -> None:
+        did = vacuum_bot.vacuum.did
+        ended = time.monotonic()
+
+        async def refresh(_: datetime) -> None:
+            self._cancel_after_cleaning.pop(did, None)
+            parts = [
+                part
+                for part in self._after_cleaning
+                if not self._is_fresh(did, part, ended)
+            ]
+            self.skipped += len(self._after_cleaning) - len(parts)
+            if parts:
+                await self._async_refresh(vacuum_bot, parts)
+
+        cancel = self._cancel_after_cleaning.pop(did, None)
+        if cancel is not None:
+            cancel()
+        self._cancel_after_cleaning[did] = async_call_later(
+            self._hass,
+            REFRESH_AFTER_CLEANING_DELAY * random.uniform(1, 1 + REFRESH_JITTER),
+            refresh,
+        )
+
+    @callback
+    def async_start(self) -> None:
+        """Start refreshing the parts with a TTL."""
+        if self._cancel_tick is not None or not self._ttls:
+            return
+
+        self._cancel_tick = async_track_time_interval(
+            self._hass, self._tick, timedelta(seconds=REFRESH_SCHEDULER_INTERVAL)
+        )
+
+    @callback
+    def _tick(self, _: datetime) -> None:
+        now = time.monotonic()
+        due_parts: Dict[str, List[str]] = {}
+        for (did, part), due in self._due.items():
+            if due > now:
+                continue
+
+            ttl = self._ttls[part]
+            received = self._dispatcher.last_received(
+                did, REFRESH_PARTS[part].event_name
+            )
+            if received is not None and now - received < ttl:
+                # the bot sent the data in the meantime
+                self.skipped += 1
+                self._due[(did, part)] = _next_due(received, ttl)
+                continue
+
+            self._due[(did, part)] = _next_due(now, ttl)
+            if self._bots[did].available:
+                due_parts.setdefault(did, []).append(part)
+
+        for did, parts in due_parts.items():
+            self._hass.async_create_task(self._async_refresh(self._bots[did], parts))
+
+    async def _async_refresh(
+        self, vacuum_bot: TrackedVacuumBot, parts: List[str]
+    ) -> None:
+        _LOGGER.debug("Refresh %s of %s", parts, vacuum_bot.vacuum.did)
+        self.refreshes += len(parts)
+        results = await async_refresh(vacuum_bot, parts)
+        failed = [
+            part for part, result in results.items() if result == REFRESH_RESULT_FAILED
+        ]
+        if failed:
+            _LOGGER.debug(
+                "Background refresh of %s failed for %s", failed, vacuum_bot.vacuum.did
+            )
+
+    @callback
+    def stop(self) -> None:
+        """Stop all refreshes and remove the bots."""
+        if self._cancel_tick is not None:
+            self._cancel_tick()
+            self._cancel_tick = None
+        for cancel in self._cancel_after_cleaning.values():
+            cancel()
+        self._cancel_after_cleaning.clear()
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe.clear()
+        self._bots.clear()
+        self._due.clear()
+        self._cleaning.clear()
@@ -3,7 +3,6 @@ import logging
 from typing import Any, Dict, Optional
 
 from deebotozmo.commands.life_span import LifeSpan
-from deebotozmo.event_emitter import EventListener
 from deebotozmo.events import (
     CleanLogEvent,
     ErrorEvent,
@@ -12,16 +11,25 @@ from deebotozmo.events import (
     StatusEvent,
     WaterInfoEvent,
 )
-from deebotozmo.vacuum_bot import VacuumBot
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import (
+    STATE_CLASS_MEASUREMENT,
+    STATE_CLASS_TOTAL_INCREASING,
+    SensorEntity,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_DESCRIPTION, STATE_UNKNOWN
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_DESCRIPTION, STATE_UNKNOWN, TIME_MILLISECONDS
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.util import dt as dt_util
 
+from .bot import TrackedVacuumBot
+from .clean_stats import PERIODS, get_period_key
 from .const import DOMAIN, LAST_ERROR
+from .entity import DeebotEntity
 from .helpers import get_device_info
 from .hub import DeebotHub
+from .metrics import LatencyHistogram
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -37,35 +45,45 @@ async def async_setup_entry(
     new_devices = []
     for vacbot in hub.vacuum_bots:
         # General
-        new_devices.append(DeebotLastCleanImageSensor(vacbot))
-        new_devices.append(DeebotWaterLevelSensor(vacbot))
-        new_devices.append(DeebotLastErrorSensor(vacbot))
+        new_devices.append(DeebotLastCleanImageSensor(hub, vacbot))
+        new_devices.append(DeebotWaterLevelSensor(hub, vacbot))
+        new_devices.append(DeebotLastErrorSensor(hub, vacbot))
 
         # Components
-        new_devices.append(DeebotComponentSensor(vacbot, LifeSpan.BRUSH))
-        new_devices.append(DeebotComponentSensor(vacbot, LifeSpan.SIDE_BRUSH))
-        new_devices.append(DeebotComponentSensor(vacbot, LifeSpan.FILTER))
+        new_devices.append(DeebotComponentSensor(hub, vacbot, LifeSpan.BRUSH))
+        new_devices.append(DeebotComponentSensor(hub, vacbot, LifeSpan.SIDE_BRUSH))
+        new_devices.append(DeebotComponentSensor(hub, vacbot, LifeSpan.FILTER))
 
         # Stats
-        new_devices.append(DeebotStatsSensor(vacbot, "area"))
-        new_devices.append(DeebotStatsSensor(vacbot, "time"))
-        new_devices.append(DeebotStatsSensor(vacbot, "type"))
-        new_devices.append(DeebotStatsSensor(vacbot, "cid"))
-        new_devices.append(DeebotStatsSensor(vacbot, "start"))
+        new_devices.append(DeebotStatsSensor(hub, vacbot, "area"))
+        new_devices.append(DeebotStatsSensor(hub, vacbot, "time"))
+        new_devices.append(DeebotStatsSensor(hub, vacbot, "type"))
+        new_devices.append(DeebotStatsSensor(hub, vacbot, "cid"))
+        new_devices.append(DeebotStatsSensor(hub, vacbot, "start"))
+        for period in PERIODS:
+            new_devices.append(DeebotCleanTotalsSensor(hub, vacbot, period))
+
+        # Diagnostics
+        new_devices.append(DeebotEventCountSensor(hub, vacbot))
+        new_devices.append(DeebotHandlerLatencySensor(hub, vacbot))
+        new_devices.append(DeebotCommandQueueSensor(hub, vacbot))
+
+    new_devices.append(DeebotCloudConnectionSensor(hub, config_entry))
 
     if new_devices:
         async_add_entities(new_devices)
 
 
-class DeebotBaseSensor(SensorEntity):  # type: ignore
+class DeebotBaseSensor(DeebotEntity, SensorEntity):  # type: ignore
     """Deebot base sensor."""
 
     _attr_should_poll = False
     _attr_entity_registry_enabled_default = False
+    _unknown_when_unavailable = True
 
-    def __init__(self, vacuum_bot: VacuumBot, device_id: str):
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot, device_id: str):
         """Initialize the Sensor."""
-        self._vacuum_bot: VacuumBot = vacuum_bot
+        super().__init__(hub, vacuum_bot)
 
         if self._vacuum_bot.vacuum.nick is not None:
             name: str = self._vacuum_bot.vacuum.nick
@@ -84,14 +102,15 @@ class DeebotBaseSensor(SensorEntity):  # type: ignore
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
         await super().async_added_to_hass()
+        if not self._unknown_when_unavailable:
+            return
 
         async def on_event(event: StatusEvent) -> None:
             if not event.available:
                 self._attr_native_value = STATE_UNKNOWN
-                self.async_write_ha_state()
+                self.async_schedule_write_ha_state()
 
-        listener: EventListener = self._vacuum_bot.events.status.subscribe(on_event)
-        self.async_on_remove(listener.unsubscribe)
+        self._subscribe("status", on_event)
 
 
 class DeebotLastCleanImageSensor(DeebotBaseSensor):
@@ -99,9 +118,9 @@ class DeebotLastCleanImageSensor(DeebotBaseSensor):
 
     _attr_icon = "mdi:image-search"
 
-    def __init__(self, vacuum_bot: VacuumBot):
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot):
         """Initialize the Sensor."""
-        super().__init__(vacuum_bot, "last_clean_image")
+        super().__init__(hub, vacuum_bot, "last_clean_image")
 
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
@@ -112,10 +131,9 @@ class DeebotLastCleanImageSensor(DeebotBaseSensor):
                 self._attr_native_value = event.logs[0].image_url
             else:
                 self._attr_native_value = STATE_UNKNOWN
-            self.async_write_ha_state()
+            self.async_schedule_write_ha_state()
 
-        listener: EventListener = self._vacuum_bot.events.clean_logs.subscribe(on_event)
-        self.async_on_remove(listener.unsubscribe)
+        self._subscribe("clean_logs", on_event)
 
 
 class DeebotWaterLevelSensor(DeebotBaseSensor):
@@ -123,9 +141,9 @@ class DeebotWaterLevelSensor(DeebotBaseSensor):
 
     _attr_icon = "mdi:water"
 
-    def __init__(self, vacuum_bot: VacuumBot):
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot):
         """Initialize the Sensor."""
-        super().__init__(vacuum_bot, "water_level")
+        super().__init__(hub, vacuum_bot, "water_level")
 
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
@@ -134,10 +152,9 @@ class DeebotWaterLevelSensor(DeebotBaseSensor):
         async def on_event(event: WaterInfoEvent) -> None:
             if event.amount:
                 self._attr_native_value = event.amount
-                self.async_write_ha_state()
+                self.async_schedule_write_ha_state()
 
-        listener: EventListener = self._vacuum_bot.events.water_info.subscribe(on_event)
-        self.async_on_remove(listener.unsubscribe)
+        self._subscribe("water_info", on_event)
 
 
 class DeebotComponentSensor(DeebotBaseSensor):
@@ -145,10 +162,12 @@ class DeebotComponentSensor(DeebotBaseSensor):
 
     _attr_native_unit_of_measurement = "%"
 
-    def __init__(self, vacuum_bot: VacuumBot, component: LifeSpan):
+    def __init__(
+        self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot, component: LifeSpan
+    ):
         """Initialize the Sensor."""
         device_id = component.value
-        super().__init__(vacuum_bot, device_id)
+        super().__init__(hub, vacuum_bot, device_id)
         self._attr_icon = (
             "mdi:air-filter" if component == LifeSpan.FILTER else "mdi:broom"
         )
@@ -162,19 +181,18 @@ class DeebotComponentSensor(DeebotBaseSensor):
             value = event.get(self._id, None)
             if value:
                 self._attr_native_value = value
-                self.async_write_ha_state()
+                self.async_schedule_write_ha_state()
 
-        listener: EventListener = self._vacuum_bot.events.lifespan.subscribe(on_event)
-        self.async_on_remove(listener.unsubscribe)
+        self._subscribe("lifespan", on_event)
 
 
 class DeebotStatsSensor(DeebotBaseSensor):
     """Deebot stats sensor."""
 
-    def __init__(self, vacuum_bot: VacuumBot, stats_type: str):
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot, stats_type: str):
         """Initialize the Sensor."""
 
-        super().__init__(vacuum_bot, f"stats_{stats_type}")
+        super().__init__(hub, vacuum_bot, f"stats_{stats_type}")
         self._type = stats_type
         if stats_type == "area":
             self._attr_icon = "mdi:floor-plan"
@@ -201,10 +219,9 @@ class DeebotStatsSensor(DeebotBaseSensor):
                 else:
                     self._attr_native_value = value
 
-                self.async_write_ha_state()
+                self.async_schedule_write_ha_state()
 
-        listener: EventListener = self._vacuum_bot.events.stats.subscribe(on_event)
-        self.async_on_remove(listener.unsubscribe)
+        self._subscribe("stats", on_event)
 
 
 class DeebotLastErrorSensor(DeebotBaseSensor):
@@ -212,9 +229,9 @@ class DeebotLastErrorSensor(DeebotBaseSensor):
 
     _attr_icon = "mdi:alert-circle"
 
-    def __init__(self, vacuum_bot: VacuumBot):
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot):
         """Initialize the Sensor."""
-        super().__init__(vacuum_bot, LAST_ERROR)
+        super().__init__(hub, vacuum_bot, LAST_ERROR)
 
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
@@ -223,7 +240,160 @@ class DeebotLastErrorSensor(DeebotBaseSensor):
         async def on_event(event: ErrorEvent) -> None:
             self._attr_native_value = event.code
             self._attr_extra_state_attributes = {CONF_DESCRIPTION: event.description}
+            self.async_schedule_write_ha_state()
+
+        self._subscribe("error", on_event)
+
+
+class DeebotEventCountSensor(DeebotBaseSensor):
+    """Deebot sensor, which counts the events received from the bot."""
+
+    _attr_icon = "mdi:counter"
+    _attr_should_poll = True
+    _attr_state_class = STATE_CLASS_TOTAL_INCREASING
+    _unknown_when_unavailable = False
+
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot):
+        """Initialize the Sensor."""
+        super().__init__(hub, vacuum_bot, "events")
+
+    async def async_update(self) -> None:
+        """Update the counters from the dispatcher metrics."""
+        metrics = self._hub.dispatcher.get_metrics(self._vacuum_bot.vacuum.did)
+        self._attr_native_value = sum(metric.events for metric in metrics.values())
+        self._attr_extra_state_attributes = {
+            event_name: metric.events for event_name, metric in sorted(metrics.items())
+        }
+
+
+class DeebotHandlerLatencySensor(DeebotBaseSensor):
+    """Deebot sensor, which shows the 95th percentile of the event handler latency."""
+
+    _attr_icon = "mdi:timer-outline"
+    _attr_should_poll = True
+    _attr_state_class = STATE_CLASS_MEASUREMENT
+    _attr_native_unit_of_measurement = TIME_MILLISECONDS
+    _unknown_when_unavailable = False
+
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot):
+        """Initialize the Sensor."""
+        super().__init__(hub, vacuum_bot, "handler_latency")
+
+    async def async_update(self) -> None:
+        """Update the latency from the dispatcher metrics."""
+        metrics = self._hub.dispatcher.get_metrics(self._vacuum_bot.vacuum.did)
+        total = LatencyHistogram()
+        attributes = {}
+        for event_name, metric in sorted(metrics.items()):
+            total.merge(metric.latency)
+            latency = metric.latency.as_dict()
+            attributes[event_name] = {
+                "p95_ms": latency["p95_ms"],
+                "max_ms": latency["max_ms"],
+            }
+
+        p95 = total.percentile(95)
+        self._attr_native_value = None if p95 is None else round(p95 * 1000, 3)
+        self._attr_extra_state_attributes = attributes
+
+
+class DeebotCommandQueueSensor(DeebotBaseSensor):
+    """Deebot sensor, which shows the number of commands waiting to be sent."""
+
+    _attr_icon = "mdi:tray-full"
+    _attr_should_poll = True
+    _attr_state_class = STATE_CLASS_MEASUREMENT
+    _unknown_when_unavailable = False
+
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot):
+        """Initialize the Sensor."""
+        super().__init__(hub, vacuum_bot, "command_queue")
+        self._command_queue = vacuum_bot.command_queue
+
+    async def async_update(self) -> None:
+        """Update the sensor from the command queue metrics."""
+        metrics = self._command_queue.as_dict()
+        self._attr_native_value = metrics.pop("depth")
+        self._attr_extra_state_attributes = metrics
+
+
+class DeebotCleanTotalsSensor(DeebotBaseSensor):
+    """Deebot sensor, which shows the cleaned area of the current day, week or month."""
+
+    _attr_icon = "mdi:floor-plan"
+    _attr_native_unit_of_measurement = "mq"
+    _attr_state_class = STATE_CLASS_TOTAL_INCREASING
+    _unknown_when_unavailable = False
+
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot, period: str):
+        """Initialize the Sensor."""
+        super().__init__(hub, vacuum_bot, f"totals_{period}")
+        self._period = period
+
+    @callback
+    def _update(self) -> None:
+        did = self._vacuum_bot.vacuum.did
+        totals = self._hub.clean_stats.get_totals(did, self._period)
+        self._attr_native_value = totals.area
+        self._attr_extra_state_attributes = {
+            "time": round(totals.time / 60),
+            "runs": totals.runs,
+            "period": get_period_key(self._period, dt_util.utcnow().timestamp()),
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Set up the listeners now that hass is ready."""
+        await super().async_added_to_hass()
+        self._update()
+
+        @callback
+        def on_change(*_: Any) -> None:
+            self._update()
+            self.async_schedule_write_ha_state()
+
+        self.async_on_remove(
+            self._hub.clean_stats.async_add_listener(
+                self._vacuum_bot.vacuum.did, on_change
+            )
+        )
+        # start of a new period
+        self.async_on_remove(
+            async_track_time_change(self.hass, on_change, hour=0, minute=0, second=0)
+        )
+
+
+class DeebotCloudConnectionSensor(SensorEntity):  # type: ignore
+    """Deebot cloud connection sensor, which shows the circuit breaker state."""
+
+    _attr_should_poll = False
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:cloud-sync"
+
+    def __init__(self, hub: DeebotHub, config_entry: ConfigEntry):
+        """Initialize the Sensor."""
+        self._hub: DeebotHub = hub
+        self._attr_name = f"{config_entry.title}_cloud_connection"
+        self._attr_unique_id = f"{config_entry.entry_id}_cloud_connection"
+
+    @property
+    def native_value(self) -> str:
+        """Return the state of the circuit breaker."""
+        return self._hub.circuit_breaker.state.value
+
+    @property
+    def extra_state_attributes(self) -> Dict[str, Any]:
+        """Return entity specific state attributes."""
+        return {
+            "failures": self._hub.circuit_breaker.failures,
+            "trips": self._hub.circuit_breaker.trips,
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Set up the listener now that hass is ready."""
+        await super().async_added_to_hass()
+
+        @callback
+        def on_change() -> None:
             self.async_write_ha_state()
 
-        listener: EventListener = self._vacuum_bot.events.error.subscribe(on_event)
-        self.async_on_remove(listener.unsubscribe)
+        self.async_on_remove(self._hub.circuit_breaker.add_listener(on_change))
@@ -0,0 +1,236 @@
+"""Storage module."""
+import base64
+import logging
+import time
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from deebotozmo.events import (
+    BatteryEvent,
+    CleanLogEntry,
+    CleanLogEvent,
+    ErrorEvent,
+    FanSpeedEvent,
+    LifeSpanEvent,
+    RoomsEvent,
+    StatsEvent,
+    StatusEvent,
+    WaterInfoEvent,
+)
+from deebotozmo.models import RequestAuth, Room, Vacuum, VacuumState
+from deebotozmo.vacuum_bot import VacuumBot
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STORAGE_VERSION
+from .dispatcher import EventDispatcher
+
+_LOGGER = logging.getLogger(__name__)
+
+_KEY_DEVICE_ID = "device_id"
+_KEY_AUTH = "auth"
+_KEY_DEVICES = "devices"
+_KEY_EVENTS = "events"
+_KEY_MAPS = "maps"
+
+
+def _decode_clean_logs(data: Dict[str, Any]) -> CleanLogEvent:
+    return CleanLogEvent([CleanLogEntry(**log) for log in data["logs"]])
+
+
+def _decode_rooms(data: Dict[str, Any]) -> RoomsEvent:
+    return RoomsEvent([Room(**room) for room in data["rooms"]])
+
+
+def _decode_status(data: Dict[str, Any]) -> StatusEvent:
+    state = data["state"]
+    return StatusEvent(data["available"], None if state is None else VacuumState(state))
+
+
+# Events, which are part of the snapshot, by their name on VacuumBot.events
+_EVENT_DECODERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "battery": lambda data: BatteryEvent(**data),
+    "clean_logs": _decode_clean_logs,
+    "error": lambda data: ErrorEvent(**data),
+    "fan_speed": lambda data: FanSpeedEvent(**data),
+    "lifespan": lambda data: LifeSpanEvent(**data),  # type: ignore
+    "rooms": _decode_rooms,
+    "stats": lambda data: StatsEvent(**data),
+    "status": _decode_status,
+    "water_info": lambda data: WaterInfoEvent(**data),
+}
+
+
+def _encode_event(event: Any) -> Dict[str, Any]:
+    if isinstance(event, dict):
+        # LifeSpanEvent is a TypedDict
+        return dict(event)
+    if isinstance(event, CleanLogEvent):
+        # only the last clean is used by the entities
+        event = CleanLogEvent(event.logs[:1])
+
+    return asdict(event)
+
+
+def get_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store of the given config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}", private=True)
+
+
+def get_snapshot_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the state snapshot store of the given config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.snapshot", private=True)
+
+
+def get_clean_stats_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the clean statistics store of the given config entry."""
+    return Store(
+        hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.clean_stats", private=True
+    )
+
+
+class HubStore:
+    """Persisted data of a hub, which survives restarts."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store = get_store(hass, entry_id)
+        self._data: Dict[str, Any] = {}
+
+    async def async_load(self) -> None:
+        """Load the stored data."""
+        self._data = await self._store.async_load() or {}
+
+    async def async_save(self) -> None:
+        """Save the data."""
+        await self._store.async_save(self._data)
+
+    @property
+    def device_id(self) -> Optional[str]:
+        """Return the stored client device id."""
+        return self._data.get(_KEY_DEVICE_ID)
+
+    @device_id.setter
+    def device_id(self, device_id: str) -> None:
+        if self._data.get(_KEY_DEVICE_ID) != device_id:
+            # tokens are only valid for the device id they were issued for
+            self._data.pop(_KEY_AUTH, None)
+        self._data[_KEY_DEVICE_ID] = device_id
+
+    @property
+    def auth_expires(self) -> Optional[float]:
+        """Return the expiry of the stored auth token as timestamp."""
+        auth = self._data.get(_KEY_AUTH)
+        return auth["expires"] if auth else None
+
+    def get_auth(self) -> Optional[RequestAuth]:
+        """Return the stored auth, if it is still valid."""
+        auth = self._data.get(_KEY_AUTH)
+        if not auth or auth["expires"] <= time.time():
+            return None
+
+        return RequestAuth(
+            auth["user_id"], auth["realm"], auth["token"], auth["resource"]
+        )
+
+    def set_auth(self, auth: RequestAuth, expires: float) -> None:
+        """Store the given auth with its expiry timestamp."""
+        self._data[_KEY_AUTH] = {
+            "user_id": auth.user_id,
+            "realm": auth.realm,
+            "token": auth.token,
+            "resource": auth.resource,
+            "expires": expires,
+        }
+
+    def clear_auth(self) -> None:
+        """Remove the stored auth."""
+        self._data.pop(_KEY_AUTH, None)
+
+    @property
+    def devices(self) -> List[Vacuum]:
+        """Return the devices of the last successful connection."""
+        return [Vacuum(device) for device in self._data.get(_KEY_DEVICES, [])]
+
+    @devices.setter
+    def devices(self, devices: List[Vacuum]) -> None:
+        self._data[_KEY_DEVICES] = [dict(device) for device in devices]
+
+
+class StateSnapshot:
+    """Last known state of the bots, which is restored on startup.
+
+    The snapshot holds the last event of each bot per event type and the last
+    rendered map. It is saved on shutdown and on unload.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store = get_snapshot_store(hass, entry_id)
+        self._events: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._maps: Dict[str, bytes] = {}
+        self._map_sources: Dict[str, Callable[[], Optional[bytes]]] = {}
+
+    async def async_load(self) -> None:
+        """Load the stored snapshot."""
+        data = await self._store.async_load() or {}
+        self._events = data.get(_KEY_EVENTS, {})
+        self._maps = {
+            did: base64.b64decode(image)
+            for did, image in data.get(_KEY_MAPS, {}).items()
+        }
+
+    async def async_save(
+        self, dispatcher: EventDispatcher, vacuum_bots: Iterable[VacuumBot]
+    ) -> None:
+        """Save the last known state of the given bots."""
+        events: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        maps: Dict[str, str] = {}
+        for vacuum_bot in vacuum_bots:
+            did = vacuum_bot.vacuum.did
+            bot_events = dict(self._events.get(did, {}))
+            for event_name, event in dispatcher.last_events(did).items():
+                if event_name in _EVENT_DECODERS:
+                    bot_events[event_name] = _encode_event(event)
+            events[did] = bot_events
+
+            image = self.get_map(did)
+            if image is not None:
+                maps[did] = base64.b64encode(image).decode()
+
+        self._events = events
+        await self._store.async_save({_KEY_EVENTS: events, _KEY_MAPS: maps})
+        _LOGGER.debug("Saved state snapshot of %d bots", len(events))
+
+    @callback
+    def restore(self, dispatcher: EventDispatcher, vacuum_bot: VacuumBot) -> None:
+        """Pass the stored events of the given bot to the dispatcher."""
+        for event_name, data in self._events.get(vacuum_bot.vacuum.did, {}).items():
+            decoder = _EVENT_DECODERS.get(event_name)
+            if decoder is None:
+                continue
+            try:
+                dispatcher.restore(vacuum_bot, event_name, decoder(data))
+            except (KeyError, TypeError, ValueError):
+                _LOGGER.debug("Could not restore %s event", event_name, exc_info=True)
+
+    def get_map(self, did: str) -> Optional[bytes]:
+        """Return the last map image of the given bot."""
+        source = self._map_sources.get(did)
+        image = source() if source is not None else None
+        return image if image is not None else self._maps.get(did)
+
+    @callback
+    def add_map_source(
+        self, did: str, source: Callable[[], Optional[bytes]]
+    ) -> CALLBACK_TYPE:
+        """Add the function, which returns the current map image of the given bot."""
+        self._map_sources[did] = source
+
+        @callback
+        def remove_map_source() -> None:
+            image = source()
+            if image is not None:
+                # keep the image for the snapshot on unload
+                self._maps[did] = image
+            self._map_sources.pop(did, None)
+
+        return remove_map_source
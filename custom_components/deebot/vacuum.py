@@ -1,21 +1,13 @@
 """Support for Deebot Vaccums."""
 import dataclasses
 import logging
+import time
+from datetime import datetime
 from typing import Any, Dict, List, Mapping, Optional
 
 import voluptuous as vol
-from deebotozmo.commands import (
-    Charge,
-    Clean,
-    FanSpeedLevel,
-    PlaySound,
-    SetFanSpeed,
-    SetRelocationState,
-    SetWaterInfo,
-)
-from deebotozmo.commands.clean import CleanAction, CleanArea, CleanMode
-from deebotozmo.commands.custom import CustomCommand
-from deebotozmo.event_emitter import EventListener
+from deebotozmo.commands import Charge, Clean, FanSpeedLevel, PlaySound, SetFanSpeed
+from deebotozmo.commands.clean import CleanAction
 from deebotozmo.events import (
     BatteryEvent,
     CustomCommandEvent,
@@ -24,8 +16,7 @@ from deebotozmo.events import (
     RoomsEvent,
     StatusEvent,
 )
-from deebotozmo.models import Room, VacuumState
-from deebotozmo.vacuum_bot import VacuumBot
+from deebotozmo.models import VacuumState
 from homeassistant.components.vacuum import (
     SUPPORT_BATTERY,
     SUPPORT_FAN_SPEED,
@@ -41,29 +32,27 @@ from homeassistant.components.vacuum import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import entity_platform
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
-from homeassistant.util import slugify
+from homeassistant.util import dt as dt_util
 
+from .bot import TrackedVacuumBot
+from .clean_history import entry_as_dict
+from .commands import REFRESH_PARTS, async_refresh, get_command
 from .const import (
     DOMAIN,
-    EVENT_BATTERY,
-    EVENT_CLEAN_LOGS,
+    EVENT_CLEAN_HISTORY,
     EVENT_CUSTOM_COMMAND,
-    EVENT_ERROR,
-    EVENT_FAN_SPEED,
-    EVENT_LIFE_SPAN,
-    EVENT_MAP,
-    EVENT_ROOMS,
-    EVENT_STATS,
-    EVENT_STATUS,
-    EVENT_WATER,
+    EVENT_REFRESH_FINISHED,
+    EVENT_REPLAY_FINISHED,
     LAST_ERROR,
     VACUUMSTATE_TO_STATE,
 )
-from .helpers import get_device_info
+from .entity import DeebotEntity
+from .helpers import RoomIndex, get_device_info
 from .hub import DeebotHub
 
 _LOGGER = logging.getLogger(__name__)
@@ -84,23 +73,33 @@ SUPPORT_DEEBOT: int = (
 # Must be kept in sync with services.yaml
 SERVICE_REFRESH = "refresh"
 SERVICE_REFRESH_PART = "part"
+SERVICE_REFRESH_ALL = "all"
 SERVICE_REFRESH_SCHEMA = {
-    vol.Required(SERVICE_REFRESH_PART): vol.In(
-        [
-            EVENT_STATUS,
-            EVENT_ERROR,
-            EVENT_FAN_SPEED,
-            EVENT_CLEAN_LOGS,
-            EVENT_WATER,
-            EVENT_BATTERY,
-            EVENT_STATS,
-            EVENT_LIFE_SPAN,
-            EVENT_ROOMS,
-            EVENT_MAP,
-        ]
+    vol.Required(SERVICE_REFRESH_PART): vol.All(
+        cv.ensure_list, [vol.In([*REFRESH_PARTS, SERVICE_REFRESH_ALL])]
     )
 }
 
+SERVICE_START_RECORDING = "start_recording"
+SERVICE_STOP_RECORDING = "stop_recording"
+SERVICE_REPLAY = "replay"
+SERVICE_REPLAY_FILE = "file"
+SERVICE_REPLAY_SPEED = "speed"
+SERVICE_REPLAY_SCHEMA = {
+    vol.Required(SERVICE_REPLAY_FILE): cv.string,
+    vol.Optional(SERVICE_REPLAY_SPEED, default=1.0): vol.All(
+        vol.Coerce(float), vol.Range(min=0)
+    ),
+}
+
+SERVICE_QUERY_CLEAN_HISTORY = "query_clean_history"
+SERVICE_QUERY_CLEAN_HISTORY_START = "start"
+SERVICE_QUERY_CLEAN_HISTORY_END = "end"
+SERVICE_QUERY_CLEAN_HISTORY_SCHEMA = {
+    vol.Optional(SERVICE_QUERY_CLEAN_HISTORY_START): cv.datetime,
+    vol.Optional(SERVICE_QUERY_CLEAN_HISTORY_END): cv.datetime,
+}
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -112,7 +111,7 @@ async def async_setup_entry(
 
     new_devices = []
     for vacbot in hub.vacuum_bots:
-        new_devices.append(DeebotVacuum(hass, vacbot))
+        new_devices.append(DeebotVacuum(hub, vacbot))
 
     if new_devices:
         async_add_entities(new_devices)
@@ -124,37 +123,45 @@ async def async_setup_entry(
         SERVICE_REFRESH_SCHEMA,
         "_service_refresh",
     )
+    platform.async_register_entity_service(
+        SERVICE_START_RECORDING, {}, "_service_start_recording"
+    )
+    platform.async_register_entity_service(
+        SERVICE_STOP_RECORDING, {}, "_service_stop_recording"
+    )
+    platform.async_register_entity_service(
+        SERVICE_REPLAY, SERVICE_REPLAY_SCHEMA, "_service_replay"
+    )
+    platform.async_register_entity_service(
+        SERVICE_QUERY_CLEAN_HISTORY,
+        SERVICE_QUERY_CLEAN_HISTORY_SCHEMA,
+        "_service_query_clean_history",
+    )
 
 
-def _unsubscribe_listeners(listeners: List[EventListener]) -> None:
-    for listener in listeners:
-        listener.unsubscribe()
-
-
-class DeebotVacuum(StateVacuumEntity):  # type: ignore
+class DeebotVacuum(DeebotEntity, StateVacuumEntity):  # type: ignore
     """Deebot Vacuum."""
 
     _attr_should_poll = False
 
-    def __init__(self, hass: HomeAssistant, vacuum_bot: VacuumBot):
+    def __init__(self, hub: DeebotHub, vacuum_bot: TrackedVacuumBot):
         """Initialize the Deebot Vacuum."""
-        self._hass: HomeAssistant = hass
-        self._device: VacuumBot = vacuum_bot
+        super().__init__(hub, vacuum_bot)
 
-        if self._device.vacuum.nick is not None:
-            name: str = self._device.vacuum.nick
+        if self._vacuum_bot.vacuum.nick is not None:
+            name: str = self._vacuum_bot.vacuum.nick
         else:
             # In case there is no nickname defined, use the device id
-            name = self._device.vacuum.did
+            name = self._vacuum_bot.vacuum.did
 
         self._battery: Optional[int] = None
         self._fan_speed: Optional[str] = None
         self._state: Optional[VacuumState] = None
-        self._rooms: List[Room] = []
+        self._room_index: RoomIndex = RoomIndex()
         self._last_error: Optional[ErrorEvent] = None
 
         self._attr_name = name
-        self._attr_unique_id = self._device.vacuum.did
+        self._attr_unique_id = self._vacuum_bot.vacuum.did
 
     async def async_added_to_hass(self) -> None:
         """Set up the event listeners now that hass is ready."""
@@ -162,37 +169,34 @@ class DeebotVacuum(StateVacuumEntity):  # type: ignore
 
         async def on_battery(event: BatteryEvent) -> None:
             self._battery = event.value
-            self.async_write_ha_state()
+            self.async_schedule_write_ha_state()
 
         async def on_rooms(event: RoomsEvent) -> None:
-            self._rooms = event.rooms
-            self.async_write_ha_state()
+            self._room_index = RoomIndex.from_rooms(event.rooms)
+            self.async_schedule_write_ha_state()
 
         async def on_fan_speed(event: FanSpeedEvent) -> None:
             self._fan_speed = event.speed
-            self.async_write_ha_state()
+            self.async_schedule_write_ha_state()
 
         async def on_status(event: StatusEvent) -> None:
             self._attr_available = event.available
             self._state = event.state
-            self.async_write_ha_state()
+            self.async_schedule_write_ha_state()
 
         async def on_error(event: ErrorEvent) -> None:
             self._last_error = event
-            self.async_write_ha_state()
+            self.async_schedule_write_ha_state()
 
         async def on_custom_command(event: CustomCommandEvent) -> None:
             self.hass.bus.fire(EVENT_CUSTOM_COMMAND, dataclasses.asdict(event))
 
-        listeners: List[EventListener] = [
-            self._device.events.status.subscribe(on_status),
-            self._device.events.battery.subscribe(on_battery),
-            self._device.events.rooms.subscribe(on_rooms),
-            self._device.events.fan_speed.subscribe(on_fan_speed),
-            self._device.events.error.subscribe(on_error),
-            self._device.events.custom_command.subscribe(on_custom_command),
-        ]
-        self.async_on_remove(lambda: _unsubscribe_listeners(listeners))
+        self._subscribe("status", on_status)
+        self._subscribe("battery", on_battery)
+        self._subscribe("rooms", on_rooms)
+        self._subscribe("fan_speed", on_fan_speed)
+        self._subscribe("error", on_error)
+        self._subscribe("custom_command", on_custom_command)
 
     @property
     def supported_features(self) -> int:
@@ -227,18 +231,7 @@ class DeebotVacuum(StateVacuumEntity):  # type: ignore
         Implemented by platform classes. Convention for attribute names
         is lowercase snake_case.
         """
-        attributes: Dict[str, Any] = {}
-        for room in self._rooms:
-            # convert room name to snake_case to meet the convention
-            room_name = "room_" + slugify(room.subtype)
-            room_values = attributes.get(room_name)
-            if room_values is None:
-                attributes[room_name] = room.id
-            elif isinstance(room_values, list):
-                room_values.append(room.id)
-            else:
-                # Convert from int to list
-                attributes[room_name] = [room_values, room.id]
+        attributes: Dict[str, Any] = {**self._room_index.attributes}
 
         if self._last_error:
             attributes[
@@ -250,31 +243,31 @@ class DeebotVacuum(StateVacuumEntity):  # type: ignore
     @property
     def device_info(self) -> DeviceInfo:
         """Return device specific attributes."""
-        return get_device_info(self._device)
+        return get_device_info(self._vacuum_bot)
 
     async def async_set_fan_speed(self, fan_speed: str, **kwargs: Any) -> None:
         """Set fan speed."""
-        await self._device.execute_command(SetFanSpeed(fan_speed))
+        await self._vacuum_bot.execute_command(SetFanSpeed(fan_speed))
 
     async def async_return_to_base(self, **kwargs: Any) -> None:
         """Set the vacuum cleaner to return to the dock."""
-        await self._device.execute_command(Charge())
+        await self._vacuum_bot.execute_command(Charge())
 
     async def async_stop(self, **kwargs: Any) -> None:
         """Stop the vacuum cleaner."""
-        await self._device.execute_command(Clean(CleanAction.STOP))
+        await self._vacuum_bot.execute_command(Clean(CleanAction.STOP))
 
     async def async_pause(self) -> None:
         """Pause the vacuum cleaner."""
-        await self._device.execute_command(Clean(CleanAction.PAUSE))
+        await self._vacuum_bot.execute_command(Clean(CleanAction.PAUSE))
 
     async def async_start(self) -> None:
         """Start the vacuum cleaner."""
-        await self._device.execute_command(Clean(CleanAction.START))
+        await self._vacuum_bot.execute_command(Clean(CleanAction.START))
 
     async def async_locate(self, **kwargs: Any) -> None:
         """Locate the vacuum cleaner."""
-        await self._device.execute_command(PlaySound())
+        await self._vacuum_bot.execute_command(PlaySound())
 
     async def async_send_command(
         self, command: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any
@@ -282,60 +275,93 @@ class DeebotVacuum(StateVacuumEntity):  # type: ignore
         """Send a command to a vacuum cleaner."""
         _LOGGER.debug("async_send_command %s with %s", command, params)
 
-        if command in ["relocate", SetRelocationState.name]:
-            await self._device.execute_command(SetRelocationState())
-        elif command == "auto_clean":
+        if command == "auto_clean":
             clean_type = params.get("type", "auto") if params else "auto"
             if clean_type == "auto":
                 _LOGGER.warning('DEPRECATED! Please use "vacuum.start" instead.')
                 await self.async_start()
-        elif command in ["spot_area", "custom_area", "set_water"]:
-            if params is None:
-                raise RuntimeError("Params are required!")
-
-            if command in "spot_area":
-                await self._device.execute_command(
-                    CleanArea(
-                        mode=CleanMode.SPOT_AREA,
-                        area=str(params["rooms"]),
-                        cleanings=params.get("cleanings", 1),
-                    )
-                )
-            elif command == "custom_area":
-                await self._device.execute_command(
-                    CleanArea(
-                        mode=CleanMode.CUSTOM_AREA,
-                        area=str(params["coordinates"]),
-                        cleanings=params.get("cleanings", 1),
-                    )
-                )
-            elif command == "set_water":
-                await self._device.execute_command(SetWaterInfo(params["amount"]))
         else:
-            await self._device.execute_command(CustomCommand(command, params))
-
-    async def _service_refresh(self, part: str) -> None:
-        """Service to manually refresh."""
-        _LOGGER.debug("Manually refresh %s", part)
-        if part == EVENT_STATUS:
-            self._device.events.status.request_refresh()
-        elif part == EVENT_ERROR:
-            self._device.events.error.request_refresh()
-        elif part == EVENT_FAN_SPEED:
-            self._device.events.fan_speed.request_refresh()
-        elif part == EVENT_CLEAN_LOGS:
-            self._device.events.clean_logs.request_refresh()
-        elif part == EVENT_WATER:
-            self._device.events.water_info.request_refresh()
-        elif part == EVENT_BATTERY:
-            self._device.events.battery.request_refresh()
-        elif part == EVENT_STATS:
-            self._device.events.stats.request_refresh()
-        elif part == EVENT_LIFE_SPAN:
-            self._device.events.lifespan.request_refresh()
-        elif part == EVENT_ROOMS:
-            self._device.events.rooms.request_refresh()
-        elif part == EVENT_MAP:
-            self._device.events.map.request_refresh()
-        else:
-            _LOGGER.warning('Service "refresh" called with unknown part: %s', part)
+            if command == "spot_area" and params and "rooms" in params:
+                params = {**params, "rooms": self._room_index.resolve(params["rooms"])}
+            await self._vacuum_bot.execute_command(get_command(command, params))
+
+    async def _service_refresh(self, part: List[str]) -> None:
+        """Service to manually refresh the given parts."""
+        parts = list(REFRESH_PARTS) if SERVICE_REFRESH_ALL in part else part
+        _LOGGER.debug("Manually refresh %s", parts)
+
+        start = time.monotonic()
+        results = await async_refresh(self._vacuum_bot, parts)
+        self.hass.bus.async_fire(
+            EVENT_REFRESH_FINISHED,
+            {
+                "entity_id": self.entity_id,
+                "parts": results,
+                "duration_ms": round((time.monotonic() - start) * 1000),
+            },
+        )
+
+    async def _service_start_recording(self) -> None:
+        """Service to record all messages of the bot."""
+        path = await self._hub.async_start_recording(self._vacuum_bot.vacuum.did)
+        _LOGGER.debug("Recording messages of %s to %s", self.entity_id, path)
+
+    async def _service_stop_recording(self) -> None:
+        """Service to stop recording the messages of the bot."""
+        await self._hub.async_stop_recording(self._vacuum_bot.vacuum.did)
+
+    async def _service_replay(self, file: str, speed: float) -> None:
+        """Service to replay a recording into the bot and report the handler timings."""
+        count, duration, timings = await self._hub.async_replay(
+            self._vacuum_bot.vacuum.did, file, speed
+        )
+
+        handlers = {
+            name: {
+                "calls": timing.calls,
+                "total_ms": round(timing.total * 1000, 3),
+                "max_ms": round(timing.max * 1000, 3),
+            }
+            for name, timing in sorted(
+                timings.items(), key=lambda item: item[1].total, reverse=True
+            )
+        }
+        _LOGGER.info(
+            "Replayed %d messages into %s in %.3fs: %s",
+            count,
+            self.entity_id,
+            duration,
+            handlers,
+        )
+        self.hass.bus.async_fire(
+            EVENT_REPLAY_FINISHED,
+            {
+                "entity_id": self.entity_id,
+                "file": file,
+                "messages": count,
+                "duration": round(duration, 3),
+                "handlers": handlers,
+            },
+        )
+
+    async def _service_query_clean_history(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> None:
+        """Service to query the clean history of the bot."""
+        history = self._hub.clean_histories[self._vacuum_bot.vacuum.did]
+        entries = await history.async_query(
+            None if start is None else dt_util.as_timestamp(start),
+            None if end is None else dt_util.as_timestamp(end),
+        )
+        self.hass.bus.async_fire(
+            EVENT_CLEAN_HISTORY,
+            {
+                "entity_id": self.entity_id,
+                "start": None if start is None else start.isoformat(),
+                "end": None if end is None else end.isoformat(),
+                "count": len(entries),
+                "area": sum(entry.area or 0 for entry in entries),
+                "duration": sum(entry.total_time or 0 for entry in entries),
+                "cleans": [entry_as_dict(entry) for entry in entries],
+            },
+        )
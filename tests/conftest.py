@@ -1,4 +1,4 @@
-"""Global fixtures for integration_blueprint integration."""
+"""Global fixtures for deebot integration."""
 # Fixtures allow you to replace functions with a Mock object. You can perform
 # many options via the Mock to reflect a particular behavior from the original
 # function that you want to see without going through the function's actual logic.
@@ -14,12 +14,28 @@
 #
 # See here for more info: https://docs.pytest.org/en/latest/fixture.html (note that
 # pytest includes fixtures OOB which you can use as defined on this page)
+from typing import Any, Dict, List
 from unittest.mock import patch
 
 import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import (
+    CONF_DEVICES,
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    CONF_VERIFY_SSL,
+)
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.deebot.const import CONF_CONTINENT, CONF_COUNTRY, DOMAIN
+
+from .simulator import SimulatedBroker, SimulatedCloud
 
 pytest_plugins = "pytest_homeassistant_custom_component"
 
+# Collected by the "perf" fixture and printed at the end of the session
+_PERF_RESULTS: List[Dict[str, Any]] = []
+
 
 # This fixture enables loading custom integrations in all tests.
 # Remove to enable selective use of this fixture
@@ -40,24 +56,79 @@ def skip_notifications_fixture():
         yield
 
 
-# This fixture, when used, will result in calls to async_get_data to return None. To have the call
-# return a value, we would add the `return_value=<VALUE_TO_RETURN>` parameter to the patch call.
-@pytest.fixture(name="bypass_get_data")
-def bypass_get_data_fixture():
-    """Skip calls to get data from API."""
-    with patch(
-        "custom_components.integration_blueprint.IntegrationBlueprintApiClient.async_get_data"
-    ):
-        yield
+@pytest.fixture(name="fleet_size", params=[1])
+def fleet_size_fixture(request):
+    """Return the number of simulated bots. Override it to simulate a fleet."""
+    return request.param
 
 
-# In this fixture, we are forcing calls to async_get_data to raise an Exception. This is useful
-# for exception handling.
-@pytest.fixture(name="error_on_get_data")
-def error_get_data_fixture():
-    """Simulate error when retrieving data from API."""
+# This fixture replaces the Ecovacs cloud with a simulated one, serving fleet_size bots.
+@pytest.fixture(name="cloud")
+def cloud_fixture(fleet_size):
+    """Simulate the ecovacs cloud."""
+    cloud = SimulatedCloud(fleet_size)
     with patch(
-        "custom_components.integration_blueprint.IntegrationBlueprintApiClient.async_get_data",
-        side_effect=Exception,
+        "custom_components.deebot.hub.aiohttp_client.async_get_clientsession",
+        return_value=cloud,
     ):
-        yield
+        yield cloud
+
+
+# This fixture replaces the MQTT client of deebotozmo with one connected to a simulated broker.
+@pytest.fixture(name="broker")
+def broker_fixture():
+    """Simulate the ecovacs MQTT broker."""
+    broker = SimulatedBroker()
+    with patch("deebotozmo.ecovacs_mqtt.Client", broker.create_client):
+        yield broker
+
+
+@pytest.fixture(name="config_entry")
+async def config_entry_fixture(hass, cloud):
+    """Return a config entry with all simulated bots selected.
+
+    The entry is unloaded after the test, if the test did not unload it.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=3,
+        data={
+            CONF_USERNAME: "user@example.com",
+            CONF_PASSWORD: "password",
+            CONF_COUNTRY: "it",
+            CONF_CONTINENT: "eu",
+            CONF_VERIFY_SSL: True,
+            CONF_DEVICES: cloud.device_names,
+        },
+    )
+    entry.add_to_hass(hass)
+    yield entry
+
+    if entry.state == ConfigEntryState.LOADED:
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+@pytest.fixture(name="perf")
+def perf_fixture(request):
+    """Record a measurement, which is reported at the end of the session."""
+
+    def record(metric: str, value: float, unit: str) -> None:
+        _PERF_RESULTS.append(
+            {"test": request.node.name, "metric": metric, "value": value, "unit": unit}
+        )
+
+    return record
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Print the recorded measurements."""
+    if not _PERF_RESULTS:
+        return
+
+    terminalreporter.section("deebot performance")
+    for result in _PERF_RESULTS:
+        terminalreporter.write_line(
+            f"{result['test']:<60} {result['metric']:<28} "
+            f"{result['value']:>12.3f} {result['unit']}"
+        )
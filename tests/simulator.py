@@ -0,0 +1,256 @@
+"""Simulated Ecovacs cloud and MQTT broker for offline tests and benchmarks.
+
+The cloud serves the REST endpoints used by deebotozmo through an object, which
+replaces the aiohttp session of the hub. The broker replaces the gmqtt client of
+deebotozmo and routes synthetic device messages to the subscribed clients.
+"""
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Union
+from urllib.parse import urlparse
+
+from gmqtt import Subscription
+
+USER_ID = "simulated-user"
+TOKEN = "simulated-token"
+DEVICE_CLASS = "yna5xi"
+
+
+class SimulatedBot:
+    """State of a simulated bot."""
+
+    def __init__(self, index: int):
+        self.did = f"did-{index:04d}"
+        self.name = f"E{index:016d}"
+        self.nick = f"Deebot {index}"
+        self.resource = f"res{index:04d}"
+        self.battery = 100
+        self.online = True
+
+    @property
+    def device(self) -> Dict[str, Any]:
+        """Return the device as returned by GetGlobalDeviceList."""
+        return {
+            "did": self.did,
+            "name": self.name,
+            "nick": self.nick,
+            "class": DEVICE_CLASS,
+            "resource": self.resource,
+            "company": "eco-ng",
+            "deviceName": "DEEBOT OZMO 950 Series",
+            "status": 1 if self.online else 0,
+        }
+
+    def command_data(self, command_name: str) -> Union[Dict[str, Any], List[Any]]:
+        """Return the body data of the answer to the given get command."""
+        if command_name == "getBattery":
+            return {"value": self.battery, "isLow": 0}
+        if command_name == "getChargeState":
+            return {"isCharging": 1, "mode": "slot"}
+        if command_name == "getCleanInfo":
+            return {"trigger": "none", "state": "idle"}
+        if command_name == "getError":
+            return {"code": [0]}
+        if command_name == "getSpeed":
+            return {"speed": 0}
+        if command_name == "getWaterInfo":
+            return {"enable": 0, "amount": 2}
+        if command_name == "getLifeSpan":
+            return [
+                {"type": "brush", "left": 8000, "total": 18000},
+                {"type": "sideBrush", "left": 5000, "total": 12000},
+                {"type": "heap", "left": 4000, "total": 7200},
+            ]
+        if command_name == "getStats":
+            return {"area": 20, "cid": "1", "time": 600, "type": "auto", "start": 0}
+        if command_name == "getCachedMapInfo":
+            return {"info": []}
+        return {}
+
+
+class _Response:
+    """Minimal aiohttp response."""
+
+    status = 200
+    headers = {"Content-Type": "application/json"}
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = data
+
+    def raise_for_status(self) -> None:
+        """Do nothing, the simulated cloud never fails."""
+
+    async def json(self, **_: Any) -> Dict[str, Any]:
+        """Return the json body."""
+        return self._data
+
+
+class _RequestContext:
+    def __init__(self, cloud: "SimulatedCloud", url: str, data: Dict[str, Any]):
+        self._cloud = cloud
+        self._url = url
+        self._data = data
+
+    async def __aenter__(self) -> _Response:
+        return await self._cloud.async_respond(self._url, self._data)
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+
+class SimulatedCloud:
+    """Serve the Ecovacs REST endpoints for a fleet of simulated bots.
+
+    Use an instance as replacement of the aiohttp session.
+    """
+
+    def __init__(self, fleet_size: int, latency: float = 0.0):
+        self.bots: Dict[str, SimulatedBot] = {
+            bot.did: bot for bot in (SimulatedBot(i) for i in range(fleet_size))
+        }
+        self.latency = latency
+        # number of calls per endpoint or command name
+        self.calls: Counter = Counter()
+
+    @property
+    def device_names(self) -> List[str]:
+        """Return the names of all bots."""
+        return [bot.name for bot in self.bots.values()]
+
+    def get(
+        self, url: str, *, params: Optional[Dict[str, Any]] = None, **_: Any
+    ) -> _RequestContext:
+        """Simulate a GET request."""
+        return _RequestContext(self, url, params or {})
+
+    def post(
+        self, url: str, *, json: Optional[Dict[str, Any]] = None, **_: Any
+    ) -> _RequestContext:
+        """Simulate a POST request."""
+        return _RequestContext(self, url, json or {})
+
+    async def async_respond(self, url: str, data: Dict[str, Any]) -> _Response:
+        """Return the response for the given request."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = urlparse(url).path
+        if path.endswith("/user/login"):
+            self.calls["login"] += 1
+            return _Response(
+                {"code": "0000", "data": {"uid": USER_ID, "accessToken": "access"}}
+            )
+        if path.endswith("/getAuthCode"):
+            self.calls["getAuthCode"] += 1
+            return _Response({"code": "0000", "data": {"authCode": "code"}})
+        if path.endswith("/users/user.do"):
+            self.calls["loginByItToken"] += 1
+            return _Response({"result": "ok", "token": TOKEN, "userId": USER_ID})
+        if path.endswith("/appsvr/app.do"):
+            self.calls["GetGlobalDeviceList"] += 1
+            return _Response(
+                {"code": 0, "devices": [bot.device for bot in self.bots.values()]}
+            )
+        if path.endswith("/lg/log.do"):
+            self.calls["GetCleanLogs"] += 1
+            return _Response({"ret": "ok", "logs": []})
+        if path.endswith("/iot/devmanager.do"):
+            command_name = data["cmdName"]
+            self.calls[command_name] += 1
+            bot = self.bots[data["toId"]]
+            if not bot.online:
+                return _Response({"ret": "fail", "errno": 500, "error": "timeout"})
+            return _Response(
+                {
+                    "ret": "ok",
+                    "resp": {
+                        "header": {"fwVer": "1.0.0"},
+                        "body": {"code": 0, "data": bot.command_data(command_name)},
+                    },
+                }
+            )
+
+        raise AssertionError(f"Unexpected request to {url}")
+
+
+def _matches(topic_filter: str, topic: str) -> bool:
+    filter_levels = topic_filter.split("/")
+    levels = topic.split("/")
+    if len(filter_levels) != len(levels):
+        return False
+    return all(part in ("+", level) for part, level in zip(filter_levels, levels))
+
+
+class SimulatedMqttClient:
+    """Replacement of the gmqtt client, connected to the simulated broker."""
+
+    def __init__(self, broker: "SimulatedBroker", client_id: str):
+        self._broker = broker
+        self.client_id = client_id
+        self.on_message: Any = None
+        self.topic_filters: Set[str] = set()
+
+    def set_auth_credentials(self, username: str, password: str) -> None:
+        """Ignore the credentials."""
+
+    async def connect(self, host: str, port: int, **_: Any) -> None:
+        """Connect to the simulated broker."""
+        self._broker.clients.append(self)
+
+    def subscribe(
+        self, subscriptions: Union[Subscription, List[Subscription]], **_: Any
+    ) -> None:
+        """Subscribe to the given topics."""
+        if isinstance(subscriptions, Subscription):
+            subscriptions = [subscriptions]
+        self.topic_filters.update(subscription.topic for subscription in subscriptions)
+
+    def unsubscribe(self, topic: str, **_: Any) -> None:
+        """Unsubscribe from the given topic."""
+        self.topic_filters.discard(topic)
+
+    def disconnect(self) -> None:
+        """Disconnect from the simulated broker."""
+        if self in self._broker.clients:
+            self._broker.clients.remove(self)
+
+
+class SimulatedBroker:
+    """In-process MQTT broker emitting synthetic device messages."""
+
+    def __init__(self) -> None:
+        self.clients: List[SimulatedMqttClient] = []
+        self.published: int = 0
+
+    def create_client(self, client_id: str) -> SimulatedMqttClient:
+        """Create a client. Use it to patch the gmqtt client of deebotozmo."""
+        return SimulatedMqttClient(self, client_id)
+
+    async def async_publish(self, topic: str, payload: Dict[str, Any]) -> None:
+        """Deliver the message to all subscribed clients."""
+        raw = json.dumps(payload).encode()
+        self.published += 1
+        for client in list(self.clients):
+            if any(
+                _matches(topic_filter, topic) for topic_filter in client.topic_filters
+            ):
+                await client.on_message(client, topic, raw, 0, {})
+
+    async def async_emit(
+        self, bot: SimulatedBot, event_name: str, data: Dict[str, Any]
+    ) -> None:
+        """Emit an event of the given bot, like the bot does on state changes."""
+        await self.async_publish(
+            f"iot/atr/{event_name}/{bot.did}/{DEVICE_CLASS}/{bot.resource}/j",
+            {
+                "header": {"ts": int(time.time() * 1000), "fwVer": "1.0.0"},
+                "body": {"data": data},
+            },
+        )
+
+    async def async_emit_battery(self, bot: SimulatedBot, value: int) -> None:
+        """Emit a battery event of the given bot."""
+        bot.battery = value
+        await self.async_emit(bot, "onBattery", {"value": value, "isLow": 0})
@@ -0,0 +1,135 @@
+"""Benchmarks of the deebot integration against the simulated cloud and broker.
+
+Run them with: pytest tests/test_benchmark.py
+"""
+import asyncio
+import gc
+import time
+import tracemalloc
+from datetime import timedelta
+
+import pytest
+from homeassistant.components.vacuum import ATTR_BATTERY_LEVEL
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.deebot.const import DOMAIN, STATUS_POLL_INTERVAL
+
+# Seconds to wait for the fleet to be updated
+STATE_TIMEOUT = 30
+
+pytestmark = pytest.mark.parametrize(
+    "fleet_size", [1, 10, 100, 500], indirect=True, ids=lambda size: f"{size}_bots"
+)
+
+
+async def _async_wait_for(condition):
+    """Wait until the condition is met, as the work is done in plain tasks."""
+    deadline = time.perf_counter() + STATE_TIMEOUT
+    while not condition():
+        assert time.perf_counter() < deadline, "Timed out"
+        await asyncio.sleep(0)
+
+
+async def _async_setup(hass, config_entry):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert config_entry.state == ConfigEntryState.LOADED
+    return hass.data[DOMAIN][config_entry.entry_id]
+
+
+async def test_setup_time(hass, config_entry, cloud, broker, fleet_size, perf):
+    """Measure the time until all bots are set up and subscribed."""
+    start = time.perf_counter()
+    hub = await _async_setup(hass, config_entry)
+    duration = time.perf_counter() - start
+
+    assert len(hub.vacuum_bots) == fleet_size
+    assert cloud.calls["GetGlobalDeviceList"] == 1
+    assert len(broker.clients) == 1
+    perf("setup", duration * 1000, "ms")
+    perf("setup per bot", duration * 1000 / fleet_size, "ms")
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_status_sweep(hass, config_entry, cloud, broker, fleet_size, perf):
+    """Measure one status sweep with all bots silent."""
+    hub = await _async_setup(hass, config_entry)
+    for vacbot in hub.vacuum_bots:
+        vacbot.last_seen = None
+    calls = cloud.calls["GetGlobalDeviceList"]
+
+    # the hub polls the status in a loop, which sleeps between the sweeps
+    start = time.perf_counter()
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=STATUS_POLL_INTERVAL + 1)
+    )
+    await _async_wait_for(lambda: cloud.calls["GetGlobalDeviceList"] > calls)
+    await hass.async_block_till_done()
+    duration = time.perf_counter() - start
+
+    # one request for the whole fleet
+    assert cloud.calls["GetGlobalDeviceList"] == calls + 1
+    perf("status sweep", duration * 1000, "ms")
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_event_to_state_latency(
+    hass, config_entry, cloud, broker, fleet_size, perf
+):
+    """Measure the time from a MQTT message until the state is written."""
+    await _async_setup(hass, config_entry)
+    registry = er.async_get(hass)
+    pending = {
+        registry.async_get_entity_id("vacuum", DOMAIN, did) for did in cloud.bots
+    }
+    updated = asyncio.Event()
+
+    @callback
+    def on_state_changed(event):
+        new_state = event.data["new_state"]
+        if (
+            event.data["entity_id"] in pending
+            and new_state is not None
+            and new_state.attributes.get(ATTR_BATTERY_LEVEL) == 42
+        ):
+            pending.discard(event.data["entity_id"])
+            if not pending:
+                updated.set()
+
+    remove_listener = hass.bus.async_listen(EVENT_STATE_CHANGED, on_state_changed)
+
+    # the events are notified in tasks of deebotozmo and the state writes are
+    # scheduled with call_soon, therefore async_block_till_done is not enough
+    start = time.perf_counter()
+    for bot in cloud.bots.values():
+        await broker.async_emit_battery(bot, 42)
+    await asyncio.wait_for(updated.wait(), STATE_TIMEOUT)
+    duration = time.perf_counter() - start
+    remove_listener()
+
+    perf("event to state", duration * 1000 / fleet_size, "ms/event")
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_memory_per_bot(hass, config_entry, cloud, broker, fleet_size, perf):
+    """Measure the memory allocated per bot during setup."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        await _async_setup(hass, config_entry)
+        gc.collect()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    perf("memory per bot", allocated / fleet_size / 1024, "KiB")
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
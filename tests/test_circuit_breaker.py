@@ -0,0 +1,135 @@
+"""Tests of the circuit breaker."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from custom_components.deebot.circuit_breaker import (
+    Backoff,
+    CircuitBreaker,
+    CircuitState,
+)
+
+
+@pytest.fixture(name="monotonic")
+def monotonic_fixture():
+    """Control the clock of the circuit breaker."""
+    with patch(
+        "custom_components.deebot.circuit_breaker.time.monotonic", return_value=1000.0
+    ) as monotonic:
+        yield monotonic
+
+
+def _create_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        "Test",
+        failure_threshold=3,
+        backoff=Backoff(base_delay=60, max_delay=200, jitter=0),
+    )
+
+
+def test_opens_after_threshold(monotonic):
+    """The circuit opens only after failure_threshold failures in a row."""
+    breaker = _create_breaker()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.trips == 1
+    assert breaker.delay == 60
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failures(monotonic):
+    """A success in between restarts the count of consecutive failures."""
+    breaker = _create_breaker()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.failures == 2
+
+
+def test_half_open_probe(monotonic):
+    """After the delay one probe is allowed, which closes or reopens the circuit."""
+    breaker = _create_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    monotonic.return_value += 60
+    assert breaker.allow_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+
+    # a failed probe reopens the circuit with a doubled delay
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.delay == 120
+
+    monotonic.return_value += 120
+    assert breaker.allow_request()
+    breaker.record_failure()
+    # limited by max_delay
+    assert breaker.delay == 200
+
+    monotonic.return_value += 200
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.trips == 0
+    assert breaker.delay == 60
+
+
+def test_jitter(monotonic):
+    """The delay deviates at most by the jitter."""
+    breaker = CircuitBreaker(
+        "Test", failure_threshold=1, backoff=Backoff(base_delay=100, jitter=0.2)
+    )
+
+    for _ in range(20):
+        breaker.record_failure()
+        assert 80 <= breaker.delay <= 120
+        breaker.record_success()
+
+
+def test_listeners(monotonic):
+    """The listeners are called on every state change until they are removed."""
+    breaker = _create_breaker()
+    listener = MagicMock()
+    remove_listener = breaker.add_listener(listener)
+
+    for _ in range(3):
+        breaker.record_failure()
+    assert listener.call_count == 1
+
+    monotonic.return_value += 60
+    breaker.allow_request()
+    breaker.record_success()
+    assert listener.call_count == 3
+
+    remove_listener()
+    for _ in range(3):
+        breaker.record_failure()
+    assert listener.call_count == 3
+
+
+def test_delay(monotonic):
+    """The delay is the remaining backoff and the interval again once it expired."""
+    breaker = _create_breaker()
+    assert breaker.delay == 60
+
+    for _ in range(3):
+        breaker.record_failure()
+    monotonic.return_value += 20
+    assert breaker.delay == 40
+
+    # no probe was made after the backoff, as no call was needed
+    monotonic.return_value += 50
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.delay == 60
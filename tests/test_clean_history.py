@@ -0,0 +1,81 @@
+"""Tests of the clean history."""
+from deebotozmo.events import CleanLogEntry
+
+from custom_components.deebot.clean_history import CleanHistory, entry_as_dict
+
+
+def _entry(timestamp: int, area: int = 10) -> CleanLogEntry:
+    return CleanLogEntry(
+        timestamp=timestamp,
+        image_url=f"https://example.com/{timestamp}.png",
+        type="auto",
+        area=area,
+        stop_reason="1",
+        total_time=600,
+    )
+
+
+async def test_add(hass, tmp_path):
+    """Only entries newer than the latest stored one are added, sorted."""
+    history = CleanHistory(hass, str(tmp_path / "did_1.jsonl"))
+
+    added = await history.async_add([_entry(300), _entry(100), _entry(200)])
+    assert [entry.timestamp for entry in added] == [100, 200, 300]
+    assert history.last_timestamp == 300
+
+    # the cloud returns the latest cleans again
+    added = await history.async_add([_entry(400), _entry(300), _entry(200)])
+    assert [entry.timestamp for entry in added] == [400]
+
+    assert await history.async_add([_entry(400)]) == []
+    assert len(await history.async_query()) == 4
+
+
+async def test_query(hass, tmp_path):
+    """The query returns the cleans in the inclusive range, oldest first."""
+    history = CleanHistory(hass, str(tmp_path / "did_1.jsonl"))
+    await history.async_add([_entry(timestamp) for timestamp in (100, 200, 300)])
+
+    async def query(start, end):
+        return [entry.timestamp for entry in await history.async_query(start, end)]
+
+    assert await query(None, None) == [100, 200, 300]
+    assert await query(200, None) == [200, 300]
+    assert await query(None, 200) == [100, 200]
+    assert await query(150, 250) == [200]
+    assert await query(301, None) == []
+
+
+async def test_persisted(hass, tmp_path):
+    """The entries are read from the file by a new instance."""
+    path = tmp_path / "did_1.jsonl"
+    history = CleanHistory(hass, str(path))
+    entries = [_entry(100), _entry(200, area=20)]
+    await history.async_add(entries)
+
+    # a line, which was not completely written
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("[300,10,\n")
+
+    history = CleanHistory(hass, str(path))
+    assert await history.async_query() == entries
+    assert history.last_timestamp == 200
+
+
+async def test_empty(hass, tmp_path):
+    """A bot without history has no cleans."""
+    history = CleanHistory(hass, str(tmp_path / "did_1.jsonl"))
+
+    assert await history.async_query() == []
+    assert history.last_timestamp is None
+
+
+def test_entry_as_dict():
+    """The entry is returned without the image url and with an iso start time."""
+    assert entry_as_dict(_entry(0)) == {
+        "start": "1970-01-01T00:00:00+00:00",
+        "area": 10,
+        "duration": 600,
+        "type": "auto",
+        "stop_reason": "1",
+    }
@@ -0,0 +1,116 @@
+"""Tests of the clean statistics."""
+from datetime import date, timedelta
+from typing import Optional
+from unittest.mock import MagicMock, patch
+
+from deebotozmo.events import CleanLogEntry
+from homeassistant.util import dt as dt_util
+
+from custom_components.deebot.clean_stats import (
+    PERIOD_DAY,
+    PERIOD_MONTH,
+    PERIOD_WEEK,
+    CleanStatsAggregator,
+    CleanTotals,
+)
+
+DID = "did_1"
+
+
+def _timestamp(day: int, hour: int = 12) -> int:
+    """Return the timestamp of the given local time in September 2021."""
+    start = dt_util.start_of_local_day(date(2021, 9, day)) + timedelta(hours=hour)
+    return int(start.timestamp())
+
+
+def _entry(
+    day: Optional[int], hour: int = 12, area: int = 10, total_time: int = 600
+) -> CleanLogEntry:
+    return CleanLogEntry(
+        timestamp=None if day is None else _timestamp(day, hour),
+        image_url=None,
+        type="auto",
+        area=area,
+        stop_reason="1",
+        total_time=total_time,
+    )
+
+
+async def test_add(hass):
+    """The cleans are summed up per day, week and month."""
+    stats = CleanStatsAggregator(hass, "entry_id")
+    await stats.async_load()
+
+    # 2021-09-06 is a monday
+    entries = [_entry(5), _entry(6), _entry(6, hour=18, area=5, total_time=60)]
+    assert stats.add(DID, entries) == 3
+
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(6)) == CleanTotals(15, 660, 2)
+    assert stats.get_totals(DID, PERIOD_WEEK, _timestamp(6)) == CleanTotals(15, 660, 2)
+    assert stats.get_totals(DID, PERIOD_WEEK, _timestamp(5)) == CleanTotals(10, 600, 1)
+    assert stats.get_totals(DID, PERIOD_MONTH, _timestamp(6)) == CleanTotals(
+        25, 1260, 3
+    )
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(7)) == CleanTotals()
+    assert stats.get_totals("other", PERIOD_DAY, _timestamp(6)) == CleanTotals()
+    assert stats.last_timestamp(DID) == _timestamp(6, hour=18)
+
+
+async def test_add_skips_known_cleans(hass):
+    """Cleans not newer than the last added one and without timestamp are skipped."""
+    stats = CleanStatsAggregator(hass, "entry_id")
+    await stats.async_load()
+    listener = MagicMock()
+    stats.async_add_listener(DID, listener)
+
+    stats.add(DID, [_entry(5)])
+    assert stats.add(DID, [_entry(4), _entry(5), _entry(None)]) == 0
+
+    assert stats.get_totals(DID, PERIOD_MONTH, _timestamp(5)) == CleanTotals(10, 600, 1)
+    listener.assert_called_once()
+
+
+async def test_retention(hass):
+    """Only the latest buckets per period are kept."""
+    stats = CleanStatsAggregator(hass, "entry_id")
+    with patch.dict(
+        "custom_components.deebot.clean_stats.CLEAN_STATS_RETENTION", {PERIOD_DAY: 2}
+    ):
+        await stats.async_load()
+        stats.add(DID, [_entry(1), _entry(2), _entry(3)])
+
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(1)) == CleanTotals()
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(2)) == CleanTotals(10, 600, 1)
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(3)) == CleanTotals(10, 600, 1)
+
+
+async def test_load_sorts_buckets(hass, hass_storage):
+    """Stored buckets are sorted by their key and trimmed on load."""
+    hass_storage["deebot.entry_id.clean_stats"] = {
+        "version": 1,
+        "key": "deebot.entry_id.clean_stats",
+        "data": {
+            "buckets": {
+                DID: {
+                    PERIOD_DAY: {
+                        "2021-09-03": [3, 30, 1],
+                        "2021-09-01": [1, 10, 1],
+                        "2021-09-02": [2, 20, 1],
+                    }
+                }
+            },
+            "last": {DID: _timestamp(3)},
+        },
+    }
+
+    stats = CleanStatsAggregator(hass, "entry_id")
+    with patch.dict(
+        "custom_components.deebot.clean_stats.CLEAN_STATS_RETENTION", {PERIOD_DAY: 2}
+    ):
+        await stats.async_load()
+        stats.add(DID, [_entry(4)])
+
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(1)) == CleanTotals()
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(2)) == CleanTotals()
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(3)) == CleanTotals(3, 30, 1)
+    assert stats.get_totals(DID, PERIOD_DAY, _timestamp(4)) == CleanTotals(10, 600, 1)
@@ -0,0 +1,125 @@
+"""Tests of the command queue."""
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from deebotozmo.commands import Clean, SetFanSpeed, SetWaterInfo
+from deebotozmo.commands.clean import CleanAction
+
+from custom_components.deebot.command_queue import CommandQueue, CommandType
+
+
+class _Bot:
+    """Record the sent commands, which are blocked until released."""
+
+    def __init__(self) -> None:
+        self.sent: List[CommandType] = []
+        self.failing: List[CommandType] = []
+        self.release = asyncio.Event()
+
+    async def execute(self, command: CommandType) -> Dict[str, Any]:
+        self.sent.append(command)
+        await self.release.wait()
+        if command in self.failing:
+            raise RuntimeError("failed")
+        return {"command": command}
+
+
+async def _wait_until_sending(bot: _Bot) -> None:
+    while not bot.sent:
+        await asyncio.sleep(0)
+
+
+async def test_set_commands_are_coalesced():
+    """A queued set command is replaced by a later one of the same kind."""
+    bot = _Bot()
+    queue = CommandQueue(bot.execute, rate=1000, burst=10)
+
+    blocking = asyncio.create_task(queue.async_execute(SetWaterInfo(1)))
+    await _wait_until_sending(bot)
+
+    first = SetFanSpeed(1)
+    last = SetFanSpeed(2)
+    tasks = [
+        asyncio.create_task(queue.async_execute(first)),
+        asyncio.create_task(queue.async_execute(last)),
+    ]
+    await asyncio.sleep(0)
+    assert queue.depth == 1
+
+    bot.release.set()
+    responses = await asyncio.gather(*tasks)
+    await blocking
+
+    # both callers get the response of the later command
+    assert responses == [{"command": last}, {"command": last}]
+    assert bot.sent[1:] == [last]
+    assert queue.as_dict() == {"depth": 0, "sent": 2, "dropped": 1, "throttled": 0}
+
+
+async def test_actions_are_not_coalesced():
+    """Actions are sent in the order they were issued, even with the same name."""
+    bot = _Bot()
+    queue = CommandQueue(bot.execute, rate=1000, burst=10)
+
+    commands = [
+        Clean(CleanAction.START),
+        SetFanSpeed(1),
+        Clean(CleanAction.PAUSE),
+        Clean(CleanAction.PAUSE),
+    ]
+    tasks = [asyncio.create_task(queue.async_execute(cmd)) for cmd in commands]
+    bot.release.set()
+    await asyncio.gather(*tasks)
+
+    assert bot.sent == commands
+    assert queue.dropped == 0
+
+
+async def test_exception_is_raised_to_caller():
+    """A failed command raises in its caller and the queue continues."""
+    bot = _Bot()
+    queue = CommandQueue(bot.execute, rate=1000, burst=10)
+    bot.release.set()
+
+    failing = Clean(CleanAction.START)
+    bot.failing.append(failing)
+    with pytest.raises(RuntimeError):
+        await queue.async_execute(failing)
+
+    command = SetFanSpeed(1)
+    assert await queue.async_execute(command) == {"command": command}
+    assert queue.sent == 2
+
+
+async def test_rate_limit():
+    """Commands exceeding the burst wait for the rate limit."""
+    bot = _Bot()
+    bot.release.set()
+    queue = CommandQueue(bot.execute, rate=100, burst=1)
+
+    await asyncio.gather(
+        *[queue.async_execute(Clean(CleanAction.START)) for _ in range(3)]
+    )
+
+    assert len(bot.sent) == 3
+    assert queue.throttled == 2
+
+
+async def test_cancel():
+    """Cancelling the queue cancels the callers of the sent and queued commands."""
+    bot = _Bot()
+    queue = CommandQueue(bot.execute, rate=1000, burst=10)
+
+    sending = asyncio.create_task(queue.async_execute(SetWaterInfo(1)))
+    await _wait_until_sending(bot)
+    queued = asyncio.create_task(queue.async_execute(SetFanSpeed(1)))
+    await asyncio.sleep(0)
+
+    queue.cancel()
+
+    for task in (sending, queued):
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    assert queue.depth == 0
+    assert len(bot.sent) == 1
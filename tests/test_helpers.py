@@ -0,0 +1,38 @@
+"""Tests of the helpers."""
+import pytest
+from deebotozmo.models import Room
+
+from custom_components.deebot.helpers import RoomIndex
+
+ROOMS = [
+    Room(subtype="Living Room", id=1, coordinates=""),
+    Room(subtype="Bedroom", id=2, coordinates=""),
+    Room(subtype="Bedroom", id=3, coordinates=""),
+]
+
+
+def test_room_index():
+    """The rooms are indexed by name and by id."""
+    index = RoomIndex.from_rooms(ROOMS)
+
+    assert index.ids_by_name == {"living_room": (1,), "bedroom": (2, 3)}
+    assert index.room_by_id[3] is ROOMS[2]
+    assert index.attributes == {"room_living_room": 1, "room_bedroom": (2, 3)}
+    with pytest.raises(TypeError):
+        index.ids_by_name["kitchen"] = (4,)  # type: ignore[index]
+
+
+def test_resolve():
+    """Room names are resolved to the ids of all rooms with this name."""
+    index = RoomIndex.from_rooms(ROOMS)
+
+    assert index.resolve("1, 3") == "1,3"
+    assert index.resolve(2) == "2"
+    assert index.resolve("living_room,Bedroom") == "1,2,3"
+    with pytest.raises(ValueError):
+        index.resolve("kitchen")
+    with pytest.raises(ValueError):
+        index.resolve("4")
+
+    # the ids are not checked before the rooms are known
+    assert RoomIndex().resolve("4") == "4"
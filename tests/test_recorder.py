@@ -0,0 +1,47 @@
+"""Tests of the recorder."""
+import json
+
+import pytest
+
+from custom_components.deebot.recorder import RecordedMessage, read_recording
+
+MESSAGE = {"t": 1.5, "d": "did_1", "c": "onBattery", "r": False, "m": {"value": 80}}
+
+
+def test_read_recording(tmp_path):
+    """The messages are read from the json lines."""
+    (tmp_path / "did_1.jsonl").write_text(
+        json.dumps(MESSAGE) + "\n\n" + json.dumps({**MESSAGE, "a": {"x": 1}}) + "\n"
+    )
+
+    assert read_recording(str(tmp_path), "did_1.jsonl") == [
+        RecordedMessage(1.5, "did_1", "onBattery", False, None, {"value": 80}),
+        RecordedMessage(1.5, "did_1", "onBattery", False, {"x": 1}, {"value": 80}),
+    ]
+
+
+@pytest.mark.parametrize(
+    "content,error",
+    [
+        (None, "Could not read"),
+        ("no json\n", "Line 1 of"),
+        (json.dumps(MESSAGE) + '\n{"t": 1.5, "d"', "Line 2 of"),
+        (json.dumps({"t": 1.5}) + "\n", "Line 1 of"),
+        ("[1, 2]\n", "Line 1 of"),
+    ],
+)
+def test_read_invalid_recording(tmp_path, content, error):
+    """Missing or invalid recordings raise a ValueError."""
+    if content is not None:
+        (tmp_path / "did_1.jsonl").write_text(content)
+
+    with pytest.raises(ValueError, match=error):
+        read_recording(str(tmp_path), "did_1.jsonl")
+
+
+def test_read_recording_outside_directory(tmp_path):
+    """Only files inside of the directory are read."""
+    (tmp_path / "did_1.jsonl").write_text(json.dumps(MESSAGE))
+
+    with pytest.raises(ValueError, match="recordings folder"):
+        read_recording(str(tmp_path / "recordings"), "../did_1.jsonl")